@@ -0,0 +1,6 @@
+#!/bin/bash
+if [ $# -ge 1 ]; then
+  $1 -W ignore src/benchmarks.py "${@:2}"
+else
+  echo "Usage: ./benchmarks.sh \"path to SageMath python interpreter\" [--repeat k] [--seed s] [--only name] [--history file] [--no-save] [--compare [commit]]"
+fi
@@ -0,0 +1,11 @@
+#!/bin/bash
+
+usage_str="Usage: ./compressibility_client.sh \"path to python interpreter\" \"server socket path\" \"graph in dig6 format\" \"upper bound of compressibility (optional, default=server's default)\""
+
+if [ $# == 3 ]; then
+  $1 src/compressibility_client.py $2 $3
+elif [ $# == 4 ]; then
+  $1 src/compressibility_client.py $2 $3 $4
+else
+  echo $usage_str
+fi
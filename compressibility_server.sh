@@ -0,0 +1,9 @@
+#!/bin/bash
+
+usage_str="Usage: ./compressibility_server.sh \"path to python interpreter\" [--socket path] [--upper-bound k] [--preload k] [--workers n]"
+
+if [ $# -ge 1 ]; then
+  $1 -W ignore src/compressibility_server.py "${@:2}"
+else
+  echo $usage_str
+fi
@@ -0,0 +1,8 @@
+#!/bin/bash
+if [ $# == 1 ]; then
+  $1 -W ignore src/convert_tournaments.py
+elif [ $# == 2 ] && [ $2 == "--remove" ]; then
+  $1 -W ignore src/convert_tournaments.py --remove
+else
+  echo "Usage: ./convert_tournaments.sh \"path to SageMath python interpreter\" [--remove]"
+fi
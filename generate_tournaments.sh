@@ -1,6 +1,6 @@
 #!/bin/bash
-if [ $# == 1 ]; then
-  $1 -W ignore src/generate_tournaments.py
+if [ $# -ge 1 ]; then
+  $1 -W ignore src/generate_tournaments.py "${@:2}"
 else
-  echo "Usage: ./generate_tournaments.sh \"path to SageMath python interpreter\""
-fi
\ No newline at end of file
+  echo "Usage: ./generate_tournaments.sh \"path to SageMath python interpreter\" [n] [--workers k] [--shards k]"
+fi
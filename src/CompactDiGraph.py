@@ -0,0 +1,227 @@
+from array import array
+
+'''
+Plik zawierający zwartą reprezentację grafu skierowanego, która nie wymaga
+importowania Sage. Jest używana wewnętrznie przez `Homomorphism`,
+`DiGraphExtended` i `rm_sinks_and_sources`, dzięki czemu obliczenia
+kompresyjności mogą być wykonywane w procesach, które nie ładują Sage.
+'''
+
+
+def dig6_edges(line):
+    '''Dekoduje graf skierowany zapisany w formacie dig6.
+
+    :return: tuple
+        Para (liczba wierzchołków, lista krawędzi). Krawędzie są parami
+        liczb 0, ..., n-1 uporządkowanymi leksykograficznie.
+    '''
+    data = [ord(c) - 63 for c in line.strip()]
+    if data[0] < 63:
+        n = data[0]
+        data = data[1:]
+    elif data[1] < 63:
+        n = (data[1] << 12) | (data[2] << 6) | data[3]
+        data = data[4:]
+    else:
+        raise ValueError("Zbyt duży graf.")
+
+    # macierz sąsiedztwa jest zapisana wierszami, po 6 bitów na znak,
+    # zaczynając od najstarszego bitu
+    edges = []
+    for k, chunk in enumerate(data):
+        if not chunk:
+            continue
+        for b in range(6):
+            if (chunk >> (5 - b)) & 1:
+                p = 6 * k + b
+                if p >= n * n:
+                    break
+                edges.append(divmod(p, n))
+    return n, edges
+
+
+class CompactDiGraph():
+    '''Graf skierowany o wierzchołkach 0, ..., n-1, w którym sąsiedztwa
+    wychodzące i wchodzące są zapisane w formacie CSR: sąsiedzi wierzchołka
+    v zajmują przedział [start[v], start[v + 1]) tablicy sąsiadów. Graf nie
+    może być modyfikowany.
+
+    Klasa udostępnia podzbiór metod klasy DiGraph z Sage (o tych samych
+    nazwach), z których korzystają obliczenia kompresyjności.
+
+    :param n: Int
+        Liczba wierzchołków.
+    :param edges: iterable
+        Krawędzie grafu jako pary liczb z przedziału [0, n).
+    '''
+
+    __slots__ = ['_n', '_size', '_out_start', '_out', '_in_start', '_in',
+                 '_order']
+
+    def __init__(self, n, edges):
+        edges = sorted(edges)
+        self._n = n
+        self._size = len(edges)
+        self._out_start, self._out = self._csr(n, edges, 0)
+        self._in_start, self._in = self._csr(n, edges, 1)
+        self._order = None  # porządek topologiczny, wyznaczany raz
+
+    @staticmethod
+    def _csr(n, edges, side):
+        '''Zwraca tablice (start, sąsiedzi) sąsiedztw wierzchołków
+        `edge[side]` dla krawędzi `edge` z listy `edges`.
+        '''
+        start = array('l', [0]) * (n + 1)
+        for edge in edges:
+            start[edge[side] + 1] += 1
+        for v in range(n):
+            start[v + 1] += start[v]
+        neighbors = array('l', [0]) * len(edges)
+        position = start[:-1]
+        for edge in edges:
+            v = edge[side]
+            neighbors[position[v]] = edge[1 - side]
+            position[v] += 1
+        return start, neighbors
+
+    @classmethod
+    def from_digraph(cls, G):
+        '''Zwraca graf G (np. DiGraph z Sage) jako CompactDiGraph. Wierzchołki
+        są numerowane zgodnie z kolejnością `G.vertices()`. Jeżeli G jest już
+        obiektem CompactDiGraph, to jest zwracany bez kopiowania.
+        '''
+        if isinstance(G, cls):
+            return G
+        index = {v: i for i, v in enumerate(G.vertices())}
+        return cls(len(index), [(index[u], index[v])
+                                for u, v in G.edge_iterator(labels=False)])
+
+    @classmethod
+    def from_dig6(cls, line):
+        '''Zwraca graf zapisany w formacie dig6 jako CompactDiGraph.
+        '''
+        return cls(*dig6_edges(line))
+
+    def to_digraph(self):
+        '''Zwraca kopię grafu jako DiGraph z Sage.
+        '''
+        from sage.graphs.digraph import DiGraph
+        return DiGraph([self.vertices(), list(self.edge_iterator())],
+                       format='vertices_and_edges')
+
+    def order(self):
+        return self._n
+
+    def size(self):
+        return self._size
+
+    def vertices(self):
+        return list(range(self._n))
+
+    def edge_iterator(self, labels=False):
+        '''Generator krawędzi (u, v), lub (u, v, None), jeżeli labels == True.
+        '''
+        for u in range(self._n):
+            for v in self.neighbor_out_iterator(u):
+                yield (u, v, None) if labels else (u, v)
+
+    def neighbors_out(self, v):
+        '''Zwraca tablicę wierzchołków, do których prowadzą krawędzie
+        wychodzące z v.
+        '''
+        return self._out[self._out_start[v]:self._out_start[v + 1]]
+
+    def neighbors_in(self, v):
+        '''Zwraca tablicę wierzchołków, z których prowadzą krawędzie do v.
+        '''
+        return self._in[self._in_start[v]:self._in_start[v + 1]]
+
+    def neighbor_out_iterator(self, v):
+        return iter(self.neighbors_out(v))
+
+    def neighbor_in_iterator(self, v):
+        return iter(self.neighbors_in(v))
+
+    def out_degree(self, v):
+        return self._out_start[v + 1] - self._out_start[v]
+
+    def in_degree(self, v):
+        return self._in_start[v + 1] - self._in_start[v]
+
+    def out_degrees(self):
+        '''Zwraca tablicę stopni wychodzących kolejnych wierzchołków.
+        '''
+        start = self._out_start
+        return array('l', [start[v + 1] - start[v] for v in range(self._n)])
+
+    def in_degrees(self):
+        '''Zwraca tablicę stopni wchodzących kolejnych wierzchołków.
+        '''
+        start = self._in_start
+        return array('l', [start[v + 1] - start[v] for v in range(self._n)])
+
+    def sinks(self):
+        start = self._out_start
+        return [v for v in range(self._n) if start[v] == start[v + 1]]
+
+    def sources(self):
+        start = self._in_start
+        return [v for v in range(self._n) if start[v] == start[v + 1]]
+
+    def _topological_order(self):
+        '''Algorytm Kahna. Zwraca listę wierzchołków, która zawiera wszystkie
+        wierzchołki wtw graf jest acykliczny.
+        '''
+        degree = self.in_degrees()
+        order = self.sources()
+        for v in order:  # lista rośnie w trakcie przeglądania
+            for w in self.neighbors_out(v):
+                degree[w] -= 1
+                if degree[w] == 0:
+                    order.append(w)
+        return order
+
+    def is_directed_acyclic(self):
+        if self._order is not None:
+            return True
+        order = self._topological_order()
+        if len(order) < self._n:
+            return False
+        self._order = order
+        return True
+
+    def topological_sort(self):
+        '''Zwraca listę wierzchołków posortowaną topologicznie. Porządek jest
+        wyznaczany raz. Rzuca ValueError, jeżeli graf nie jest acykliczny.
+        '''
+        if not self.is_directed_acyclic():
+            raise ValueError("Graf nie jest acykliczny.")
+        return list(self._order)
+
+    def is_connected(self):
+        '''Zwraca True wtw graf jest słabo spójny.
+        '''
+        if self._n == 0:
+            return True
+        seen = bytearray(self._n)
+        seen[0] = 1
+        stack = [0]
+        count = 1
+        while stack:
+            v = stack.pop()
+            for neighbors in [self.neighbors_out(v), self.neighbors_in(v)]:
+                for w in neighbors:
+                    if not seen[w]:
+                        seen[w] = 1
+                        count += 1
+                        stack.append(w)
+        return count == self._n
+
+    def subgraph(self, vertices):
+        '''Zwraca podgraf indukowany przez `vertices`. Wierzchołki podgrafu
+        są numerowane zgodnie z kolejnością na liście `vertices`.
+        '''
+        index = {v: i for i, v in enumerate(vertices)}
+        return CompactDiGraph(len(index), [
+            (index[u], index[w]) for u in vertices
+            for w in self.neighbors_out(u) if w in index])
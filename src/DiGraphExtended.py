@@ -1,6 +1,6 @@
-import sage.all
-from sage.graphs.digraph import DiGraph
-from copy import copy
+from src.CompactDiGraph import CompactDiGraph
+
+from array import array
 
 
 class DiGraphExtended():
@@ -9,6 +9,15 @@ class DiGraphExtended():
     Ponadto, pozwala na szybkie usuwanie źródeł i ujść z grafu, oraz
     działanie na kopii z usuniętymi wierzchołkami
 
+    Wierzchołki G są wewnętrznie numerowane liczbami 0, ..., n-1 (zgodnie z
+    kolejnością `G.vertices()`), a graf jest zamieniany na CompactDiGraph
+    (G może być obiektem DiGraph z Sage lub CompactDiGraph). Sąsiedztwa i
+    stopnie są trzymane w tablicach indeksowanych tymi numerami, a usunięte
+    wierzchołki są
+    zaznaczane w tablicy `_alive`. Dzięki temu usunięcie wszystkich
+    wierzchołków grafu kosztuje łącznie O(n + m), a zapytania o sąsiadów
+    i liczbę wierzchołków nie przeglądają listy usuniętych wierzchołków.
+
     :param keep_removed: bool
         Kontroluje, czy pamiętać wierzchołki, które zostały usunięte.
         Potrzebna, jeżeli chcemy odtworzyć graf z usniętymi wierzchołkami.
@@ -16,37 +25,54 @@ class DiGraphExtended():
         Słownik zawierający listy out_degree i in_degree dla G postaci:
         {'sink': <lista out_degree dla G>, 'source': <lista in_degree dla G>}
         Musi być zgodny ze stanem faktycznym. W przeciwnym przypadku metody
-        klasy dadzą niepoprawne wyniki!
+        klasy dadzą niepoprawne wyniki! Słownik nie jest modyfikowany.
     :param vertices: dict
         Słownik zawierający listy ujść i źródeł G postaci:
         {'sink': <lista ujść>, 'source': <lista źródeł>}.
         Musi być zgodny ze stanem faktycznym. W przeciwnym przypadku metody
-        klasy dadzą niepoprawne wyniki!
+        klasy dadzą niepoprawne wyniki! Słownik nie jest modyfikowany.
     '''
 
+    __slots__ = ['G', 'keep_removed', 'removed', '_graph', '_labels',
+                 '_index', '_degrees', '_alive', '_alive_count', '_vertices',
+                 '_history']
+
     def __init__(self, G, keep_removed=False, degrees=None, vertices=None):
         self.G = G
-        if degrees is None:
-            self.degrees = {
-                'sink': G.out_degree(labels=True),
-                'source': G.in_degree(labels=True)
+        self._graph = CompactDiGraph.from_digraph(G)
+        self._labels = G.vertices()
+        self._index = {v: i for i, v in enumerate(self._labels)}
+        n = len(self._labels)
+
+        if degrees:
+            self._degrees = {
+                rm_type: array('l', [degrees[rm_type][v]
+                                     for v in self._labels])
+                for rm_type in ['sink', 'source']
             }
         else:
-            self.degrees = degrees
+            self._degrees = {
+                'sink': self._graph.out_degrees(),
+                'source': self._graph.in_degrees()
+            }
         if vertices is None:
             self._vertices = {
-                'sink': G.sinks(),
-                'source': G.sources()
+                rm_type: [i for i, d in enumerate(self._degrees[rm_type])
+                          if d == 0]
+                for rm_type in ['sink', 'source']
             }
         else:
-            self._vertices = vertices
+            self._vertices = {
+                rm_type: [self._index[v] for v in vertices[rm_type]]
+                for rm_type in ['sink', 'source']
+            }
+
+        self._alive = bytearray([1]) * n
+        self._alive_count = n
+        self._history = []  # (typ, usunięte, poprzednia lista drugiego typu)
         self.keep_removed = keep_removed
         if keep_removed:
             self.removed = []
-        self._neighbors_out = {}
-        self._neighbors_in = {}
-        self.G_neighbors_in = {}
-        self.G_neighbors_out = {}
 
     def step(self, rm_type):
         '''Funkcja usuwająca, w zależności od parametry rm_type,
@@ -65,111 +91,136 @@ class DiGraphExtended():
         if rm_type not in ['source', 'sink']:
             raise ValueError("rm_type musi być równy 'source' lub 'sink'.")
 
-        if len(self._vertices[rm_type]) == 0:
+        to_remove = self._vertices[rm_type]
+        if len(to_remove) == 0:
             raise RuntimeError("Brak wierzchołków do usunięcia")
 
         other = 'sink' if rm_type == 'source' else 'source'
+        if rm_type == 'sink':
+            neighbors = self._graph.neighbors_in
+        else:
+            neighbors = self._graph.neighbors_out
+        degree = self._degrees[rm_type]
+        alive = self._alive
         result = []
-        to_remove = self._vertices[rm_type]
-        for v in self._vertices[rm_type]:
-            self.degrees[other][v] = 0
-            for neigh in self._get_neighbors(rm_type, v):
-                self.degrees[rm_type][neigh] -= 1
-                if self.degrees[rm_type][neigh] == 0:
-                    result.append(neigh)
-
-        self._remove_duplicates(other, rm_type)
+        for v in to_remove:
+            alive[v] = 0
+        for v in to_remove:
+            for u in neighbors(v):
+                if alive[u]:
+                    degree[u] -= 1
+                    if degree[u] == 0:
+                        result.append(u)
+        self._alive_count -= len(to_remove)
+
+        previous = self._remove_duplicates(other, to_remove)
+        self._history.append((rm_type, to_remove, previous))
         self._vertices[rm_type] = result
         if self.keep_removed:
-            self.removed += to_remove
-        self._neighbors_out = {}  # Po wykonaniu jakiejkolwiek modyfikacji,
-        # usuwa cache
-        self._neighbors_in = {}
-        return result
-
-    def _remove_duplicates(self, rm_type, other):
-        '''Usuwa wszystkie źródła jednocześnie będące ujściami
-        (rm_type = 'source') lub odwrotnie (rm_type = 'sink'). other jest
-        drugim z typów.
+            self.removed += [self._labels[v] for v in to_remove]
+        return [self._labels[v] for v in result]
+
+    def _remove_duplicates(self, rm_type, removed):
+        '''Usuwa z listy wierzchołków typu rm_type te, które zostały właśnie
+        usunięte jako wierzchołki drugiego typu (czyli wierzchołki izolowane).
+        Usunięcie źródeł nie zmienia stopni wyjściowych pozostałych
+        wierzchołków (i odwrotnie), więc lista wymaga poprawy tylko wtedy,
+        gdy któryś z usuniętych wierzchołków do niej należał.
+
+        :return: list
+            Poprzednia lista wierzchołków typu rm_type, jeżeli została
+            zmieniona, lub None.
         '''
-        self._vertices[rm_type] = list(
-            set(self._vertices[rm_type]) - set(self._vertices[other]))
-
-    def _get_neighbors(self, rm_type, v):
-        '''W zależności od rm_type, zwraca wierzchołki wychodzące
-        lub wchodzące do wierzchołka v.
+        degree = self._degrees[rm_type]
+        if any(degree[v] == 0 for v in removed):
+            alive = self._alive
+            previous = self._vertices[rm_type]
+            self._vertices[rm_type] = [v for v in previous if alive[v]]
+            return previous
+        return None
+
+    def undo(self):
+        '''Cofa ostatni wykonany (i jeszcze nie cofnięty) krok `step`. Koszt
+        jest taki sam jak koszt cofanego kroku. Pozwala to sprawdzać wiele
+        sekwencji kroków o wspólnych prefiksach bez tworzenia kopii grafu.
         '''
+        if not self._history:
+            raise RuntimeError("Brak kroków do cofnięcia.")
+        rm_type, removed, previous = self._history.pop()
+        other = 'sink' if rm_type == 'source' else 'source'
         if rm_type == 'sink':
-            if v not in self.G_neighbors_in:
-                self.G_neighbors_in[v] = self.G.neighbors_in(v)
-            return self.G_neighbors_in[v]
+            neighbors = self._graph.neighbors_in
         else:
-            if v not in self.G_neighbors_out:
-                self.G_neighbors_out[v] = self.G.neighbors_out(v)
-            return self.G_neighbors_out[v]
+            neighbors = self._graph.neighbors_out
+        degree = self._degrees[rm_type]
+        alive = self._alive
+        # usunięte wierzchołki są wciąż oznaczone jako usunięte, więc
+        # zwiększane są dokładnie te stopnie, które zmniejszył krok
+        for v in removed:
+            for u in neighbors(v):
+                if alive[u]:
+                    degree[u] += 1
+        for v in removed:
+            alive[v] = 1
+        self._alive_count += len(removed)
+
+        self._vertices[rm_type] = removed
+        if previous is not None:
+            self._vertices[other] = previous
+        if self.keep_removed:
+            del self.removed[len(self.removed) - len(removed):]
+
+    def _check_keep_removed(self):
+        if not self.keep_removed:
+            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
+                             "zapamiętane usunięte wierzchołki.")
 
     def sources(self):
-        return self._vertices['source']
+        return [self._labels[v] for v in self._vertices['source']]
 
     def sinks(self):
-        return self._vertices['sink']
+        return [self._labels[v] for v in self._vertices['sink']]
 
     def get_current(self):
         '''Zwraca kopię obecnego grafu jako DiGraph. Możliwe tylko jeżeli
         keep_removed = True
         '''
-        if not self.keep_removed:
-            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
-                             "zapamiętane usunięte wierzchołki.")
-
-        kept = list(set(self.G.vertices()) - set(self.removed))
-        return self.G.subgraph(vertices=kept, inplace=False)
+        self._check_keep_removed()
+        return self.G.subgraph(vertices=self.vertices())
 
     def current_vertex_count(self):
         '''Zwraca liczbę wierzchołków, które pozostały w grafie. Możliwe tylko
         jeżeli keep_removed = True
         '''
-        if not self.keep_removed:
-            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
-                             "zapamiętane usunięte wierzchołki.")
-
-        return len(self.G.vertices()) - len(self.removed)
+        self._check_keep_removed()
+        return self._alive_count
 
     def neighbors_out(self, v):
         '''Zwraca wierzchołki, do których prowadzą krawędzie wychodzące z v.
         '''
-        if not self.keep_removed:
-            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
-                             "zapamiętane usunięte wierzchołki.")
-
-        if v not in self._neighbors_out:
-            self._neighbors_out[v] = list(set(self.G.neighbors_out(v)) -
-                                          set(self.removed))
-        return self._neighbors_out[v]
+        self._check_keep_removed()
+        return [self._labels[u]
+                for u in self._graph.neighbors_out(self._index[v])
+                if self._alive[u]]
 
     def neighbors_in(self, v):
         '''Zwraca wierzchołki, z których prowadzą krawędzie wychodzące z v.
         '''
-        if not self.keep_removed:
-            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
-                             "zapamiętane usunięte wierzchołki.")
-
-        if v not in self._neighbors_in:
-            self._neighbors_in[v] = list(set(self.G.neighbors_in(v)) -
-                                         set(self.removed))
-        return self._neighbors_in[v]
+        self._check_keep_removed()
+        return [self._labels[u]
+                for u in self._graph.neighbors_in(self._index[v])
+                if self._alive[u]]
 
     def topological_sort(self):
-        '''Zwraca listę wierzchołków posortowaną topologicznie.
+        '''Zwraca listę wierzchołków posortowaną topologicznie. Porządek
+        topologiczny całego G jest wyznaczany raz (przez CompactDiGraph), a
+        przy kolejnych wywołaniach jest z niego tylko odfiltrowywane to, co
+        zostało usunięte.
         '''
-        if not self.keep_removed:
-            raise ValueError("Nie można odtworzyć grafu jeżeli nie zostały "
-                             "zapamiętane usunięte wierzchołki.")
-
-        sorted_G = self.G.topological_sort()
-        for v in self.removed:
-            sorted_G.remove(v)
-        return sorted_G
+        self._check_keep_removed()
+        return [self._labels[v] for v in self._graph.topological_sort()
+                if self._alive[v]]
 
     def vertices(self):
-        return list(set(self.G.vertices()) - set(self.removed))
+        return [self._labels[v] for v in range(len(self._labels))
+                if self._alive[v]]
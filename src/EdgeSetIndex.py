@@ -0,0 +1,101 @@
+class EdgeSetIndex():
+    '''Klasa przechowująca zbiory krawędzi (zapisane jako maski bitowe,
+    patrz `edge_set_bitmask` w helpers.py) w drzewie trie, w którym kolejne
+    poziomy odpowiadają kolejnym (rosnącym) numerom bitów zbioru. Pozwala
+    szybko sprawdzić, czy któryś z zapamiętanych zbiorów jest podzbiorem
+    danego zbioru - przeglądane są tylko te gałęzie drzewa, których wszystkie
+    bity należą do zapytania.
+
+    Przechowywane zbiory tworzą antyłańcuch: zbiór zawierający inny zbiór z
+    indeksu nie jest dodawany, a dodanie zbioru usuwa wszystkie zbiory, które
+    go zawierają.
+    '''
+
+    _END = -1  # klucz oznaczający, że w danym węźle kończy się zbiór
+
+    def __init__(self, masks=()):
+        self._root = {}
+        self._size = 0
+        for mask in masks:
+            self.add(mask)
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _bits(mask):
+        '''Zwraca rosnącą listę numerów ustawionych bitów maski.
+        '''
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(low.bit_length() - 1)
+            mask ^= low
+        return result
+
+    def contains_subset_of(self, mask):
+        '''Zwraca True wtw któryś z zapamiętanych zbiorów jest podzbiorem
+        zbioru `mask`.
+        '''
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for k, child in node.items():
+                if k == self._END:
+                    return True
+                if (mask >> k) & 1:
+                    stack.append(child)
+        return False
+
+    def add(self, mask):
+        '''Dodaje zbiór `mask` do indeksu, o ile nie zawiera on żadnego
+        z zapamiętanych zbiorów. Usuwa wszystkie zapamiętane nadzbiory `mask`.
+
+        :return: bool
+            True wtw zbiór został dodany.
+        '''
+        if self.contains_subset_of(mask):
+            return False
+        bits = self._bits(mask)
+        self._size -= self._remove_supersets(self._root, bits, 0)
+        node = self._root
+        for k in bits:
+            node = node.setdefault(k, {})
+        node[self._END] = True
+        self._size += 1
+        return True
+
+    def _remove_supersets(self, node, bits, i):
+        '''Usuwa z poddrzewa `node` wszystkie zbiory zawierające `bits[i:]`.
+        Zwraca liczbę usuniętych zbiorów.
+        '''
+        if i == len(bits):
+            return self._clear(node)
+        removed = 0
+        for k in list(node.keys()):
+            if k == self._END or k > bits[i]:
+                continue
+            child = node[k]
+            if k == bits[i]:
+                removed += self._remove_supersets(child, bits, i + 1)
+            else:
+                removed += self._remove_supersets(child, bits, i)
+            if len(child) == 0:
+                del node[k]
+        return removed
+
+    def _clear(self, node):
+        '''Usuwa całe poddrzewo `node` i zwraca liczbę zbiorów, które w nim
+        były.
+        '''
+        count = 0
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for k, child in current.items():
+                if k == self._END:
+                    count += 1
+                else:
+                    stack.append(child)
+        node.clear()
+        return count
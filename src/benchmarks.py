@@ -0,0 +1,339 @@
+import sys
+import os
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PATH + "/..")
+
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+from sage.graphs.graph_generators import graphs
+from sage.misc.randstate import set_random_seed
+
+from src.experiments_helpers import random_multiple_cycles_connected, \
+    random_orientation
+from src.homomorphism import Homomorphism, compressibility_number
+from src.helpers import tournament_iterator, tournament_plans, \
+    rm_sinks_and_sources, unload_tournaments
+
+import numpy as np
+import argparse
+import datetime
+import hashlib
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+'''
+Plik zawierający zestaw testów wydajności obliczeń kompresyjności.
+
+Każdy test jest mierzony na ustalonych zbiorach grafów (korpusach), które
+są generowane z podanego ziarna, więc przy każdym uruchomieniu (i w każdym
+commicie, o ile nie zmieniły się funkcje losujące grafy) są takie same:
+* 'cycles' - grafy z `random_multiple_cycles_connected` (tak jak w
+  eksperymentach) ze skierowaniem z `random_orientation`,
+* 'gnm' - losowe grafy G(n, m) z `random_orientation` (jak w
+  `measure_time` w `experiments.py`),
+* 'tests' - grafy z testów jednostkowych (ścieżki i grafy z cyklami z
+  `test_compressibility_known.py`).
+
+Wyniki są dopisywane do pliku historii (domyślnie `benchmarks/history.jsonl`)
+jako jedna linijka w formacie JSON na uruchomienie:
+{"commit": <hash commita lub null>, "dirty": <czy są niezapisane zmiany>,
+ "date": <data>, "python": <wersja>, "machine": <opis komputera>,
+ "seed": <ziarno>, "repeat": <liczba powtórzeń>,
+ "corpora": {<nazwa korpusu>: <skrót sha1 grafów w formacie dig6>},
+ "results": {<nazwa testu>: {"min": <s>, "median": <s>, "count": <liczba
+ wywołań mierzonej funkcji w jednym powtórzeniu>}}}.
+Nazwa testu ma postać `<funkcja>[<parametr>]/<korpus>`. Wyniki dwóch
+uruchomień są porównywane tylko dla testów na korpusach o tym samym skrócie.
+
+Uruchomienie:
+./benchmarks.sh "ścieżka do interpretera" [--repeat k] [--seed s]
+    [--only napis] [--history plik] [--no-save] [--compare [commit]]
+'''
+
+
+HISTORY_PATH = PATH + "/../benchmarks/history.jsonl"
+
+UPPER_BOUNDS = [6, 7, 8]
+CORPORA = ['cycles', 'gnm', 'tests']
+
+
+def _cycle_graph(n, m=None):
+    '''Graf z `test_compressibility_known.py`: ścieżka z jedną (m is None)
+    lub dwiema dołączonymi ścieżkami o n i m wierzchołkach.
+    '''
+    if m is None:
+        G = digraphs.Path(5)
+        G.add_path(list(range(5, n + 5)))
+        G.add_edges([(0, 5), (4, n + 4)])
+        return G
+    G = digraphs.Path(6)
+    G.add_path(list(range(6, n + 6)))
+    G.add_path(list(range(n + 6, n + m + 6)))
+    G.add_edges([(0, 6), (n + 6, 5), (n + m + 5, n + 5)])
+    return G
+
+
+def corpus(name, seed=0):
+    '''Zwraca listę acyklicznych grafów skierowanych (DiGraph) korpusu
+    `name`. Dla tego samego ziarna `seed` grafy są zawsze takie same.
+    '''
+    np.random.seed(seed)
+    set_random_seed(seed)
+    if name == 'cycles':
+        result = []
+        for p in [1, 0.5, 0]:
+            for j in range(1, 4):
+                G = random_multiple_cycles_connected(
+                    n_cycles=j, max_vertices=20, max_cycle_len=6,
+                    max_path_len=4, p=p, min_cycle_len=3)
+                result.append(random_orientation(G, 5)[0])
+        return result
+    if name == 'gnm':
+        return [random_orientation(graphs.RandomGNM(10, m), 9)[0]
+                for m in range(10, 15) for _ in range(2)]
+    if name == 'tests':
+        return [digraphs.Path(n) for n in [2, 5, 8]] + \
+            [_cycle_graph(n) for n in [1, 4, 7]] + \
+            [_cycle_graph(n, m) for n, m in [(2, 5), (4, 3), (6, 6)]]
+    raise ValueError("Nieznany korpus %s." % name)
+
+
+def corpus_digest(graphs_list):
+    '''Skrót sha1 grafów zapisanych w formacie dig6.
+    '''
+    digest = hashlib.sha1()
+    for G in graphs_list:
+        digest.update(G.dig6_string().encode() + b'\n')
+    return digest.hexdigest()
+
+
+def _transitive(graphs_list):
+    for G in graphs_list:
+        Homomorphism(G).homomorphic_to_transitive()
+    return len(graphs_list)
+
+
+def _one_cycle(graphs_list, orders=range(4, 10)):
+    count = 0
+    for G in graphs_list:
+        helper = Homomorphism(G)
+        for i in orders:
+            for _, plan in tournament_plans(i, 'one_cycle'):
+                helper.is_homomorphic_one_cycle(plan=plan)
+                count += 1
+    return count
+
+
+def _tournament(graphs_list, orders=(5, 6)):
+    count = 0
+    for G in graphs_list:
+        helper = Homomorphism(G)
+        for i in orders:
+            for _, plan in tournament_plans(i, 'more_cycles'):
+                helper.homomorphic_to_tournament(plan=plan)
+                count += 1
+    return count
+
+
+def _rm_sinks_and_sources(graphs_list, tournaments):
+    for G in graphs_list:
+        for T in tournaments:
+            rm_sinks_and_sources(G, T)
+    return len(graphs_list) * len(tournaments)
+
+
+def _iterate(iterator):
+    return sum(1 for _ in iterator)
+
+
+def _compressibility(graphs_list, upper_bound):
+    for G in graphs_list:
+        compressibility_number(G, upper_bound=upper_bound)
+    return len(graphs_list)
+
+
+def benchmarks(corpora):
+    '''Zwraca listę par (nazwa testu, funkcja bez argumentów zwracająca
+    liczbę wywołań mierzonej funkcji) dla korpusów `corpora` (słownik
+    {nazwa: lista grafów}).
+    '''
+    tournaments = list(tournament_iterator(6, 'more_cycles'))
+    result = [('tournament_iterator[7]',
+               lambda: _iterate(tournament_iterator(7, 'more_cycles'))),
+              ('tournament_plans[8]',
+               lambda: _iterate(tournament_plans(8, 'more_cycles')))]
+    for name, graphs_list in corpora.items():
+        result += [
+            ('homomorphic_to_transitive/%s' % name,
+             lambda g=graphs_list: _transitive(g)),
+            ('is_homomorphic_one_cycle/%s' % name,
+             lambda g=graphs_list: _one_cycle(g)),
+            ('homomorphic_to_tournament/%s' % name,
+             lambda g=graphs_list: _tournament(g)),
+            ('rm_sinks_and_sources/%s' % name,
+             lambda g=graphs_list: _rm_sinks_and_sources(g, tournaments))]
+        result += [('compressibility_number[%d]/%s' % (k, name),
+                    lambda g=graphs_list, k=k: _compressibility(g, k))
+                   for k in UPPER_BOUNDS]
+    return result
+
+
+def measure(function, repeat):
+    '''Wywołuje `function` `repeat` razy i zwraca słownik z najkrótszym i
+    medianą czasów oraz wynikiem funkcji (liczbą wywołań).
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = function()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times),
+            'count': count}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ['git'] + list(args), stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True, check=True,
+            cwd=PATH).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(seed=0, repeat=3, only=None, log=None):
+    '''Uruchamia testy wydajności i zwraca rekord historii (słownik opisany
+    na początku pliku).
+
+    :param only: string
+        Jeżeli nie jest None, to uruchamiane są tylko testy, których nazwa
+        zawiera ten napis.
+    :param log: file
+        Jeżeli nie jest None, to są do niego wypisywane kolejne wyniki.
+    '''
+    # turnieje wczytane do pamięci zmieniłyby czas czytania turniejów
+    unload_tournaments()
+    corpora = {name: corpus(name, seed) for name in CORPORA}
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    record = {'commit': _git('rev-parse', 'HEAD'),
+              'dirty': bool(status) if status is not None else None,
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'machine': platform.platform(),
+              'seed': seed, 'repeat': repeat,
+              'corpora': {name: corpus_digest(graphs_list)
+                          for name, graphs_list in corpora.items()},
+              'results': {}}
+    for name, function in benchmarks(corpora):
+        if only is not None and only not in name:
+            continue
+        record['results'][name] = measure(function, repeat)
+        if log is not None:
+            print("%-45s %10.4f s" % (name, record['results'][name]['min']),
+                  file=log)
+    return record
+
+
+def append_history(record, path=HISTORY_PATH):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'a') as file:
+        file.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def read_history(path=HISTORY_PATH):
+    '''Zwraca listę rekordów z pliku historii (pusta, jeżeli go nie ma).
+    Niekompletna ostatnia linijka (przerwany zapis) jest pomijana.
+    '''
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _corpus_of(name):
+    return name.split('/')[1] if '/' in name else None
+
+
+def compare(old, new):
+    '''Porównuje wyniki dwóch rekordów historii. Pomija testy, których nie
+    ma w obu rekordach, oraz testy na korpusach o różnych skrótach.
+
+    :return: list
+        Lista krotek (nazwa testu, stary czas, nowy czas, nowy / stary),
+        gdzie czasy są najkrótszymi czasami z powtórzeń.
+    '''
+    result = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        corpus_name = _corpus_of(name)
+        if corpus_name is not None and \
+                old['corpora'].get(corpus_name) != \
+                new['corpora'].get(corpus_name):
+            continue
+        old_time = old['results'][name]['min']
+        new_time = new['results'][name]['min']
+        result.append((name, old_time, new_time,
+                       new_time / old_time if old_time > 0 else float('inf')))
+    return result
+
+
+def find_record(history, commit=None):
+    '''Zwraca ostatni rekord z historii, którego commit zaczyna się od
+    `commit` (lub ostatni rekord, jeżeli `commit` jest None).
+    '''
+    for record in reversed(history):
+        if commit is None or (record['commit'] or '').startswith(commit):
+            return record
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Testy wydajności obliczeń kompresyjności.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None)
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', nargs='?', const='', default=None,
+                        help="porównaj z ostatnim wynikiem (lub z wynikiem "
+                             "dla podanego commita) z historii")
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help="względny wzrost czasu uznawany za regresję")
+    args = parser.parse_args(argv)
+
+    history = read_history(args.history)
+    record = run_benchmarks(args.seed, args.repeat, args.only, sys.stdout)
+    if not args.no_save:
+        append_history(record, args.history)
+    if args.compare is None:
+        return 0
+
+    old = find_record(history, args.compare or None)
+    if old is None:
+        print("Brak wyniku do porównania w %s." % args.history)
+        return 0
+    print("Porównanie z %s (%s):" % (old['commit'], old['date']))
+    regressions = 0
+    for name, old_time, new_time, ratio in compare(old, record):
+        mark = ''
+        if ratio > args.threshold:
+            mark = ' REGRESJA'
+            regressions += 1
+        print("%-45s %10.4f -> %10.4f (x%.2f)%s"
+              % (name, old_time, new_time, ratio, mark))
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
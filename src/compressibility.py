@@ -1,20 +1,31 @@
-import sage.all
-from sage.graphs.digraph import DiGraph
-
 import sys
 import os
 PATH = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, PATH + "/..")
 
 from src.homomorphism import compressibility_number
+from src.compressibility_cache import CompressibilityCache
+from src.compressibility_stats import CompressibilityStats
+from src.CompactDiGraph import CompactDiGraph
 
 if __name__ == '__main__':
     graph_dig6 = sys.argv[1]
     if len(sys.argv) == 3:
-        upper_bound = sys.argv[2]
-    digraph = DiGraph(graph_dig6, format="dig6")
+        upper_bound = int(sys.argv[2])
+    # ścieżka do pamięci podręcznej wyników (opcjonalna) - Sage jest
+    # ładowany tylko wtedy, gdy używana jest pamięć podręczna
+    cache_path = os.environ.get('COMPRESSIBILITY_CACHE')
+    cache = CompressibilityCache(cache_path) if cache_path else None
+    # jeżeli zmienna jest ustawiona, statystyki obliczeń są wypisywane na
+    # standardowe wyjście błędów w formacie JSON
+    stats = CompressibilityStats() \
+        if os.environ.get('COMPRESSIBILITY_STATS') else None
+    digraph = CompactDiGraph.from_dig6(graph_dig6)
     if len(sys.argv) == 3:
-        compr = compressibility_number(digraph, upper_bound)
+        compr = compressibility_number(digraph, upper_bound, cache=cache,
+                                       stats=stats)
     else:
-        compr = compressibility_number(digraph)
+        compr = compressibility_number(digraph, cache=cache, stats=stats)
     print(compr)
+    if stats is not None:
+        print(stats.to_json(indent=2), file=sys.stderr)
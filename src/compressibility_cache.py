@@ -0,0 +1,96 @@
+from src.CompactDiGraph import CompactDiGraph
+
+import sqlite3
+
+'''
+Plik zawierający trwałą pamięć podręczną wyników `compressibility_number`.
+'''
+
+
+class CompressibilityCache():
+    '''Pamięć podręczna wyników obliczeń kompresyjności zapisana w bazie
+    SQLite. Kluczem jest graf w postaci kanonicznej (w formacie dig6), więc
+    wynik może być wykorzystany dla każdego grafu izomorficznego.
+
+    Dla każdego grafu zapamiętywana jest para (wynik, upper_bound). Wynik -1
+    oznacza, że kompresyjność jest większa od upper_bound - taki wynik jest
+    wykorzystywany jako ograniczenie dolne, gdy później kompresyjność jest
+    liczona z większym upper_bound.
+
+    :param path: string
+        Ścieżka do pliku bazy danych. Jeżeli plik nie istnieje, to zostanie
+        utworzony.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "graph TEXT PRIMARY KEY, "
+            "compressibility INTEGER NOT NULL, "
+            "upper_bound INTEGER NOT NULL)")
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    @staticmethod
+    def key(G):
+        '''Zwraca klucz grafu G - jego postać kanoniczną w formacie dig6.
+        Wyznaczenie postaci kanonicznej wymaga Sage.
+        '''
+        if isinstance(G, CompactDiGraph):
+            G = G.to_digraph()
+        return G.canonical_label().dig6_string()
+
+    def get(self, key):
+        '''Zwraca parę (kompresyjność, upper_bound) zapamiętaną dla klucza
+        `key` lub None, jeżeli jej nie ma.
+        '''
+        row = self._connection.execute(
+            "SELECT compressibility, upper_bound FROM results WHERE graph = ?",
+            (key,)).fetchone()
+        return None if row is None else tuple(row)
+
+    def put(self, key, compressibility, upper_bound):
+        '''Zapamiętuje wynik obliczeń dla klucza `key`. Wynik -1 nie zastępuje
+        dokładnej wartości, ani wyniku -1 dla większego upper_bound.
+        '''
+        known = self.get(key)
+        if known is not None:
+            if known[0] != -1:
+                return
+            if compressibility == -1 and known[1] >= upper_bound:
+                return
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+            (key, compressibility, upper_bound))
+        self._connection.commit()
+
+    def lookup(self, key, upper_bound):
+        '''Sprawdza, co wiadomo o kompresyjności grafu o kluczu `key` przy
+        danym `upper_bound`.
+
+        :return: tuple
+            Para (wynik, ograniczenie dolne). Jeżeli wynik nie jest None, to
+            jest to wartość, którą zwróciłoby `compressibility_number`. W
+            przeciwnym przypadku kompresyjność jest nie mniejsza niż
+            ograniczenie dolne.
+        '''
+        known = self.get(key)
+        if known is None:
+            return None, 1
+        compressibility, bound = known
+        if compressibility != -1:
+            return compressibility if compressibility <= upper_bound else -1, \
+                compressibility
+        if upper_bound <= bound:
+            return -1, bound + 1
+        return None, bound + 1
@@ -0,0 +1,64 @@
+import json
+import socket
+import sys
+import threading
+
+'''
+Klient serwera kompresyjności (patrz `compressibility_server.py`). Użycie
+jest takie samo jak `compressibility.py`, ale pierwszym argumentem jest
+ścieżka do gniazda uniksowego serwera:
+    python compressibility_client.py <gniazdo> <graf dig6> [upper_bound]
+'''
+
+
+def request_compressibility(path, graphs, upper_bound=None):
+    '''Wysyła do serwera nasłuchującego na gnieździe `path` zapytania o
+    kompresyjność grafów `graphs` (w formacie dig6) i zwraca generator
+    odpowiedzi (słowników), w kolejności, w jakiej przychodzą.
+
+    Zapytania są wysyłane przez osobny wątek, w trakcie czytania
+    odpowiedzi - inaczej przy dużej liczbie zapytań serwer i klient
+    czekałyby na siebie nawzajem po zapełnieniu buforów gniazda.
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        errors = []
+
+        def send():
+            try:
+                for k, graph in enumerate(graphs):
+                    request = {'id': k, 'graph': graph}
+                    if upper_bound is not None:
+                        request['upper_bound'] = upper_bound
+                    connection.sendall(
+                        (json.dumps(request) + "\n").encode('utf-8'))
+                connection.shutdown(socket.SHUT_WR)
+            except OSError as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=send, daemon=True)
+        writer.start()
+        try:
+            with connection.makefile('r', encoding='utf-8') as responses:
+                for line in responses:
+                    yield json.loads(line)
+        finally:
+            if writer.is_alive():
+                # odpowiedzi nie są już czytane (np. generator został
+                # zamknięty) - przerywamy wysyłanie
+                connection.shutdown(socket.SHUT_RDWR)
+            writer.join()
+        if errors:
+            raise errors[0]
+
+
+if __name__ == '__main__':
+    socket_path = sys.argv[1]
+    graph_dig6 = sys.argv[2]
+    upper_bound = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    for response in request_compressibility(socket_path, [graph_dig6],
+                                            upper_bound):
+        if 'error' in response:
+            print(response['error'], file=sys.stderr)
+            sys.exit(1)
+        print(response['compressibility'])
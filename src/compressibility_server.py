@@ -0,0 +1,210 @@
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import signal
+import socketserver
+import sys
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PATH + "/..")
+
+from src.homomorphism import compressibility_number
+from src.helpers import preload_tournaments, max_tournament_order
+from src.compressibility_cache import CompressibilityCache
+from src.compressibility_stats import CompressibilityStats
+from src.CompactDiGraph import CompactDiGraph
+
+'''
+Serwer obliczający kompresyjność grafów. Turnieje są wczytywane do pamięci
+raz, przy uruchomieniu serwera, a nie przy każdym grafie (jak w
+`compressibility.py`).
+
+Zapytania i odpowiedzi są przesyłane jako linijki w formacie JSON (przez
+standardowe wejście i wyjście lub przez gniazdo uniksowe). Zapytanie ma
+postać
+    {"graph": <graf w formacie dig6>, "upper_bound": <Int, opcjonalnie>,
+     "id": <dowolna wartość, opcjonalnie>, "stats": <bool, opcjonalnie>}
+a odpowiedź
+    {"graph": ..., "upper_bound": ..., "compressibility": <Int>, "id": ...}
+(z polem "stats" zawierającym statystyki obliczeń - patrz
+`compressibility_stats.py` - jeżeli zapytanie o nie prosiło)
+lub {"error": <opis błędu>, "id": ...}, jeżeli zapytanie jest niepoprawne
+(np. górne ograniczenie jest większe od rozmiaru turniejów dostępnych w
+katalogu) lub obliczenia się nie powiodły.
+Odpowiedzi są wysyłane od razu po obliczeniu wyniku. Jeżeli zapytania są
+obsługiwane przez kilka procesów, to kolejność odpowiedzi może być inna niż
+kolejność zapytań - do ich rozróżnienia służy pole "id".
+'''
+
+
+def handle_request(line, upper_bound=10, cache=None, max_order=None):
+    '''Oblicza odpowiedź na zapytanie zapisane w linijce `line`.
+
+    :param upper_bound: Int
+        Górne ograniczenie używane, jeżeli zapytanie go nie zawiera.
+    :param cache: CompressibilityCache
+        Pamięć podręczna wyników (opcjonalna).
+    :param max_order: Int
+        Jeżeli nie jest None, to zapytania z górnym ograniczeniem większym
+        od `max_order` (największego rozmiaru dostępnych turniejów) są
+        odrzucane przed rozpoczęciem obliczeń.
+    :return: dict
+        Odpowiedź.
+    '''
+    response = {}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Zapytanie musi być obiektem JSON.")
+        if 'id' in request:
+            response['id'] = request['id']
+        graph = request['graph']
+        bound = int(request.get('upper_bound', upper_bound))
+        if max_order is not None and bound > max_order:
+            raise ValueError("Górne ograniczenie %d jest większe od "
+                             "największego rozmiaru turniejów w katalogu "
+                             "(%d)." % (bound, max_order))
+        G = CompactDiGraph.from_dig6(graph)
+        stats = CompressibilityStats() if request.get('stats') else None
+        response.update(graph=graph, upper_bound=bound,
+                        compressibility=compressibility_number(
+                            G, bound, cache=cache, stats=stats))
+        if stats is not None:
+            response['stats'] = stats.to_dict()
+    except KeyError as e:
+        response['error'] = "Brak pola %s." % e
+    except (ValueError, TypeError, IndexError) as e:
+        response['error'] = str(e)
+    except (OSError, RuntimeError) as e:
+        # np. brak pliku z turniejami - pozostałe zapytania są obsługiwane
+        response['error'] = "Błąd obliczeń: %s" % e
+    return response
+
+
+_worker_cache = None  # pamięć podręczna wyników w procesie roboczym
+_worker_upper_bound = 10
+_worker_max_order = None
+
+
+def _init_worker(cache_path, upper_bound, max_order):
+    global _worker_cache, _worker_upper_bound, _worker_max_order
+    _worker_cache = CompressibilityCache(cache_path) if cache_path else None
+    _worker_upper_bound = upper_bound
+    _worker_max_order = max_order
+
+
+def _handle_in_worker(line):
+    return handle_request(line, _worker_upper_bound, _worker_cache,
+                          _worker_max_order)
+
+
+def serve_stream(input, output, upper_bound=10, cache_path=None,
+                 workers=None):
+    '''Obsługuje zapytania czytane linijka po linijce z `input` i zapisuje
+    odpowiedzi do `output`, aż do końca wejścia. Zapytania z górnym
+    ograniczeniem większym od rozmiaru turniejów dostępnych w katalogu są
+    odrzucane.
+
+    :param input: plik tekstowy
+    :param output: plik tekstowy
+    :param upper_bound: Int
+        Domyślne górne ograniczenie na kompresyjność.
+    :param cache_path: string
+        Ścieżka do pamięci podręcznej wyników (patrz
+        `compressibility_cache.py`) lub None.
+    :param workers: Int
+        Liczba procesów obliczających wyniki. Jeżeli None lub 1, zapytania
+        są obsługiwane po kolei w bieżącym procesie.
+    :return: Int
+        Liczba obsłużonych zapytań.
+    '''
+    lines = (line for line in input if line.strip())
+    count = 0
+    max_order = max_tournament_order()
+
+    def send(response):
+        output.write(json.dumps(response) + "\n")
+        output.flush()
+
+    if workers is None or workers <= 1:
+        cache = CompressibilityCache(cache_path) if cache_path else None
+        try:
+            for line in lines:
+                send(handle_request(line, upper_bound, cache, max_order))
+                count += 1
+        finally:
+            if cache is not None:
+                cache.close()
+        return count
+
+    with mp.Pool(workers, initializer=_init_worker,
+                 initargs=(cache_path, upper_bound, max_order)) as pool:
+        for response in pool.imap_unordered(_handle_in_worker, lines):
+            send(response)
+            count += 1
+    return count
+
+
+class _ForkingUnixStreamServer(socketserver.ForkingMixIn,
+                               socketserver.UnixStreamServer):
+    '''Serwer obsługujący każde połączenie w osobnym procesie. Procesy
+    współdzielą wczytane wcześniej turnieje.
+    '''
+
+
+def make_unix_server(path, upper_bound=10, cache_path=None, workers=None):
+    '''Tworzy serwer nasłuchujący na gnieździe uniksowym `path`. Każde
+    połączenie jest obsługiwane przez `serve_stream`.
+
+    :return: socketserver.UnixStreamServer
+    '''
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve_stream(io.TextIOWrapper(self.rfile, encoding='utf-8'),
+                         io.TextIOWrapper(self.wfile, encoding='utf-8',
+                                          write_through=True),
+                         upper_bound, cache_path, workers)
+
+    if os.path.exists(path):
+        os.remove(path)
+    return _ForkingUnixStreamServer(path, Handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Serwer obliczający kompresyjność grafów.")
+    parser.add_argument('--socket', help="ścieżka do gniazda uniksowego "
+                        "(domyślnie zapytania są czytane ze stdin)")
+    parser.add_argument('--upper-bound', type=int, default=None,
+                        help="domyślne górne ograniczenie na kompresyjność "
+                        "(domyślnie 10 lub największy rozmiar turniejów w "
+                        "katalogu, jeżeli jest mniejszy)")
+    parser.add_argument('--preload', type=int, default=None,
+                        help="największy rozmiar wczytywanych turniejów "
+                        "(domyślnie równy --upper-bound)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="liczba procesów obliczających wyniki")
+    args = parser.parse_args()
+    if args.upper_bound is None:
+        args.upper_bound = min(10, max_tournament_order())
+
+    preload_tournaments(args.upper_bound if args.preload is None
+                        else args.preload)
+    # ścieżka do pamięci podręcznej wyników (opcjonalna)
+    cache_path = os.environ.get('COMPRESSIBILITY_CACHE')
+    if args.socket is None:
+        serve_stream(sys.stdin, sys.stdout, args.upper_bound, cache_path,
+                     args.workers)
+    else:
+        server = make_unix_server(args.socket, args.upper_bound, cache_path,
+                                  args.workers)
+        # przy SIGTERM gniazdo również jest usuwane
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(args.socket)
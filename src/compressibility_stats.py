@@ -0,0 +1,106 @@
+import json
+import time
+
+'''
+Plik zawierający statystyki obliczeń `compressibility_number`, zbierane
+tylko wtedy, gdy do funkcji zostanie przekazany obiekt CompressibilityStats.
+'''
+
+
+class LevelStats():
+    '''Statystyki sprawdzania turniejów o jednej liczbie wierzchołków.
+
+    Atrybuty:
+    * tournaments - liczba przeczytanych turniejów,
+    * skipped - liczba turniejów pominiętych, bo zawierają turniej, z którym
+      G jest homomorficzny,
+    * calls - słownik {nazwa metody Homomorphism: liczba wywołań},
+    * nodes - liczba węzłów odwiedzonych przez przeszukiwanie,
+    * time - słownik {faza: czas w sekundach}, gdzie fazą jest 'read'
+      (czytanie turniejów), 'filter' (sprawdzanie zawierania), 'peel'
+      (usuwanie źródeł i ujść z G) lub nazwa metody Homomorphism,
+    * wall_time - słownik {nazwa metody Homomorphism: czas w sekundach}
+      całego etapu (łącznie z czasem oczekiwania na procesy robocze).
+    '''
+
+    __slots__ = ['tournaments', 'skipped', 'calls', 'nodes', 'time',
+                 'wall_time']
+
+    def __init__(self):
+        self.tournaments = 0
+        self.skipped = 0
+        self.calls = {}
+        self.nodes = 0
+        self.time = {}
+        self.wall_time = {}
+
+    def add_time(self, phase, seconds):
+        self.time[phase] = self.time.get(phase, 0) + seconds
+
+    def add_wall_time(self, method, seconds):
+        self.wall_time[method] = self.wall_time.get(method, 0) + seconds
+
+    def add_call(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def merge(self, other):
+        '''Dodaje statystyki `other` (np. z procesu roboczego).
+        '''
+        self.tournaments += other.tournaments
+        self.skipped += other.skipped
+        self.nodes += other.nodes
+        for mine, theirs in [(self.calls, other.calls),
+                             (self.time, other.time),
+                             (self.wall_time, other.wall_time)]:
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+
+    def to_dict(self):
+        return {'tournaments': self.tournaments, 'skipped': self.skipped,
+                'calls': dict(self.calls), 'nodes': self.nodes,
+                'time': dict(self.time), 'wall_time': dict(self.wall_time)}
+
+
+class CompressibilityStats():
+    '''Statystyki obliczeń kompresyjności, osobno dla każdego poziomu
+    (liczby wierzchołków turniejów). Ten sam obiekt może być przekazany do
+    wielu wywołań `compressibility_number` - statystyki są sumowane.
+    '''
+
+    def __init__(self):
+        self.levels = {}  # liczba wierzchołków -> LevelStats
+
+    def level(self, i):
+        '''Zwraca statystyki poziomu `i` (tworząc je, jeżeli ich nie ma).
+        '''
+        if i not in self.levels:
+            self.levels[i] = LevelStats()
+        return self.levels[i]
+
+    def timed(self, i, iterable):
+        '''Zwraca elementy `iterable`, doliczając czas ich wytworzenia do
+        fazy 'read' poziomu `i`.
+        '''
+        level = self.level(i)
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                element = next(iterator)
+            except StopIteration:
+                level.add_time('read', time.perf_counter() - start)
+                return
+            level.add_time('read', time.perf_counter() - start)
+            yield element
+
+    def merge(self, other):
+        for i, level in other.levels.items():
+            self.level(i).merge(level)
+
+    def to_dict(self):
+        '''Zwraca statystyki jako słownik {i: statystyki poziomu}.
+        '''
+        return {i: self.levels[i].to_dict() for i in sorted(self.levels)}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
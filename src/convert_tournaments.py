@@ -0,0 +1,16 @@
+'''
+Plik konwertujący pliki dig6 z katalogu 'tournaments' do formatu binarnego
+opisanego w 'tournament_store.py'.
+'''
+import sys
+import os
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PATH + "/..")
+
+from src.tournament_store import convert_dig6_tree
+
+if __name__ == '__main__':
+    remove = len(sys.argv) == 2 and sys.argv[1] == '--remove'
+    for path in convert_dig6_tree(remove=remove):
+        print("Created %s" % os.path.normpath(path))
@@ -1,12 +1,14 @@
 import sage.all
 from sage.graphs.graph_generators import graphs
+from sage.misc.randstate import set_random_seed
 
 import pathlib
-import multiprocessing as mp
 import matplotlib.pyplot as plt
 from collections import Counter
 
 from src.experiments_helpers import *
+from src.results_table import load_results_table, \
+    compressibility_path_diff
 
 import os
 import sys
@@ -20,7 +22,12 @@ max_cycle_len = 7
 max_oriented_path_len = 5
 
 
-def experiments_iterator(p, j):
+def experiments_iterator(p, j, seed=None):
+    # przy ustalonym ziarnie grafy są takie same przy każdym uruchomieniu, co
+    # pozwala wznowić przerwane obliczenia (patrz check_compressibility_many)
+    if seed is not None:
+        np.random.seed(seed)
+        set_random_seed(seed)
     for i in range(N):
         max_path_len = int(max_cycle_len/2)+1
         G = random_multiple_cycles_connected(n_cycles=j,
@@ -42,23 +49,29 @@ if not os.path.exists(PATH):
 if not os.path.exists(PLOTS_PATH):
     os.mkdir(PLOTS_PATH)
 
-def generate_and_calculate():
-    for p in [1, 0.5, 0]:
-        processes = []
-        for j in range(1, max_n_cycles + 1):
-            out_file = "%.1f:%d.out" % (p, j)
-            process = mp.Process(target=check_compressibility_many,
-                                 args=(experiments_iterator(p, j), ),
-                                 kwargs={"upper_bound": 8,
-                                         "save_results": PATH + out_file})
-            processes.append(process)
-            process.start()
+def generate_and_calculate(workers=None):
+    cells = {PATH + "%.1f:%d.out" % (p, j):
+             experiments_iterator(p, j, seed=int(10 * p) * 100 + j)
+             for p in [1, 0.5, 0] for j in range(1, max_n_cycles + 1)}
+    run_experiments(cells, upper_bound=8, workers=workers,
+                    cache=PATH + "cache.sqlite")
+    return results_table()
+
+
+def results_table():
+    '''Zwraca tablicę wyników wszystkich komórek eksperymentu (patrz
+    `results_table.py`), wczytywaną raz dla wszystkich wykresów.
+    '''
+    files = {PATH + "%.1f:%d.out" % (p, j): (p, j)
+             for p in [1, 0.5, 0] for j in range(1, max_n_cycles + 1)}
+    return load_results_table(files, PATH + "results.npy")
 
 
 def plot_hist(ax, data, title, save_file, xlabel=True):
     bins = np.array([0, 1, 2, 3, 4, 5])
 
-    _, bins, patches = ax.hist(data, bins=bins, rwidth=0.5)
+    counts, _ = np.histogram(data, bins=bins)
+    ax.hist(bins[:-1], bins=bins, weights=counts, rwidth=0.5)
 
     xlabels = ['', '1', '2', '3', '4+', '']
     N_labels = len(xlabels)
@@ -73,30 +86,16 @@ def plot_hist(ax, data, title, save_file, xlabel=True):
     ax.set_ylabel("Liczba grafów")
 
 
-def plots_p():
+def plots_p(table):
     titles = {1: "Tylko ścieżki zewnętrzne (typ 1)",
               0.5: "Kombinacja ścieżek zewnętrznych i wewnętrznych (typ 2)",
               0: "Tylko ścieżki wewnętrzne (typ 3)"}
     fig, axs = plt.subplots(3, 1, figsize=(6, 9))
+    # obliczenia przerwane po przekroczeniu budżetu są pomijane
+    diff, finished = compressibility_path_diff(table)
     for i, p in enumerate([1, 0.5, 0]):
-        diff_tab = []
-        comp = []
-        for j in range(1, max_n_cycles + 1):
-            in_file = PATH + "%.1f:%d.out" % (p, j)
-            for line in open(in_file, 'r'):
-                _, compressibility, path_len = line.split()
-                compressibility = int(compressibility)
-                path_len = int(path_len)
-                if compressibility != -1:
-                    comp.append(compressibility)
-                    diff = compressibility - path_len
-                    if diff > 4:
-                        diff = 4
-                else:
-                    comp.append(9)
-                    diff = 4
-                diff_tab.append(diff)
-        plot_hist(axs[i], diff_tab, titles[p], "hist:%.1f.png" % p)
+        plot_hist(axs[i], diff[table['p'][finished] == p], titles[p],
+                  "hist:%.1f.png" % p)
 
     for ax in axs.flat:
         ax.label_outer()
@@ -104,25 +103,15 @@ def plots_p():
     fig.show()
 
 
-def plots_p_1_diff_cycles():
+def plots_p_1_diff_cycles(table):
     fig, axs = plt.subplots(2, 2, figsize=(6, 6))
+    diff, finished = compressibility_path_diff(table)
+    p = table['p'][finished]
+    n_cycles = table['n_cycles'][finished]
     for j in range(1, max_n_cycles + 1):
-        diff_tab = []
-        in_file = PATH + "%.1f:%d.out" % (1, j)
-        for line in open(in_file, 'r'):
-            _, compressibility, path_len = line.split()
-            compressibility = int(compressibility)
-            path_len = int(path_len)
-            if compressibility != -1:
-                diff = compressibility - path_len
-                if diff > 4:
-                    diff = 4
-            else:
-                diff = 4
-            diff_tab.append(diff)
-
         cykl = "cykl" if j == 1 else "cykle"
-        plot_hist(axs[int((j-1)/2), (j-1) % 2], diff_tab, "%d %s" % (j, cykl),
+        plot_hist(axs[int((j-1)/2), (j-1) % 2],
+                  diff[(p == 1) & (n_cycles == j)], "%d %s" % (j, cykl),
                   "hist:1.0:%d.png" % j, False)
 
     for ax in axs.flat:
@@ -131,27 +120,9 @@ def plots_p_1_diff_cycles():
     fig.show()
 
 
-def plot_density():
-    densities = []
-    compr_minus_path = []
-    for p in [1, 0.5, 0]:
-        for j in range(1, max_n_cycles + 1):
-            in_file = PATH + "%.1f:%d.out" % (p, j)
-            for line in open(in_file, 'r'):
-                graph, compressibility, path_len = line.split()
-                compressibility = int(compressibility)
-                path_len = int(path_len)
-                graph = DiGraph(graph)
-                density = len(graph.edges()) / len(graph.vertices())
-                densities.append(density)
-                if compressibility != -1:
-                    diff = compressibility - path_len
-                    if diff > 4:
-                        diff = 4
-                else:
-                    diff = 4
-                compr_minus_path.append(diff)
-    plt.scatter(densities, compr_minus_path)
+def plot_density(table):
+    compr_minus_path, finished = compressibility_path_diff(table)
+    plt.scatter(table['density'][finished], compr_minus_path)
     plt.xlabel("Gęstość")
     plt.ylabel("Kompresyjność - długość najdłuższej ścieżki")
 
@@ -162,27 +133,9 @@ def plot_density():
     plt.show()
 
 
-def plot_triangles():
-    triangles_num = []
-    compr_minus_path = []
-    for p in [1, 0.5, 0]:
-        for j in range(1, max_n_cycles + 1):
-            in_file = PATH + "%.1f:%d.out" % (p, j)
-            for line in open(in_file, 'r'):
-                graph, compressibility, path_len = line.split()
-                compressibility = int(compressibility)
-                path_len = int(path_len)
-                graph = DiGraph(graph).to_undirected()
-                triangles_num.append(graph.triangles_count())
-                if compressibility != -1:
-                    diff = compressibility - path_len
-                    if diff > 4:
-                        diff = 4
-                else:
-                    diff = 4
-                compr_minus_path.append(diff)
-
-    plt.scatter(triangles_num, compr_minus_path)
+def plot_triangles(table):
+    compr_minus_path, finished = compressibility_path_diff(table)
+    plt.scatter(table['triangles'][finished], compr_minus_path)
     plt.xlabel("Liczba trójkątów")
     plt.ylabel("Kompresyjność - długość najdłuższej ścieżki")
 
@@ -223,8 +176,9 @@ def plot_time():
 
 if __name__ == "__main__":
     #generate_and_calculate()
-    plots_p()
-    plots_p_1_diff_cycles()
-    plot_density()
-    plot_triangles()
+    table = results_table()
+    plots_p(table)
+    plots_p_1_diff_cycles(table)
+    plot_density(table)
+    plot_triangles(table)
     plot_time()
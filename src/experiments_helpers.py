@@ -3,10 +3,17 @@ from sage.graphs.digraph_generators import digraphs
 from sage.graphs.digraph import DiGraph
 from sage.graphs.graph import Graph
 
-from src.homomorphism import compressibility_number
+from src.homomorphism import compressibility_number, \
+    compressibility_numbers, CompressibilityInterval
+from src.compressibility_cache import CompressibilityCache
+from src.CompactDiGraph import CompactDiGraph
 
 import numpy as np
+from itertools import islice
 from time import time
+import multiprocessing as mp
+import os
+import queue
 import warnings
 
 
@@ -175,10 +182,89 @@ def random_multiple_cycles_connected(n_cycles, max_vertices, max_cycle_len,
     return G
 
 
+def _random_levels(neighbors, max_path_len, max_attempts):
+    '''Losuje poziomy 0, ..., `max_path_len` wierzchołków tak, żeby
+    sąsiednie wierzchołki miały różne poziomy. Wierzchołki są przeglądane w
+    losowej kolejności, a każdy dostaje losowy poziom spośród tych, których
+    nie mają już jego sąsiedzi. Jeżeli taki poziom nie istnieje, to
+    losowanie jest powtarzane (co najwyżej `max_attempts` razy).
+    '''
+    n = len(neighbors)
+    for _ in range(max_attempts):
+        levels = [-1] * n
+        choices = np.random.random(n)
+        for v in np.random.permutation(n):
+            used = {levels[w] for w in neighbors[v]}
+            free = [level for level in range(max_path_len + 1)
+                    if level not in used]
+            if len(free) == 0:
+                break
+            levels[v] = free[int(choices[v] * len(free))]
+        else:
+            return levels
+    raise ValueError("Nie udało się wylosować skierowania o najdłuższej "
+                     "ścieżce długości co najwyżej %d." % max_path_len)
+
+
+def random_orientations(G, max_path_len, count, max_attempts=1000):
+    '''Losuje `count` acyklicznych skierowań grafu `G`, których długość
+    najdłuższej ścieżki skierowanej jest mniejsza lub równa `max_path_len`.
+
+    Wierzchołkom są losowane poziomy 0, ..., `max_path_len` (różne dla
+    sąsiednich wierzchołków), a każda krawędź jest skierowana od niższego
+    poziomu do wyższego. Poziomy rosną wzdłuż każdej ścieżki skierowanej,
+    więc skierowanie jest acykliczne, a jego najdłuższa ścieżka ma co
+    najwyżej `max_path_len` krawędzi. Każde takie skierowanie może zostać
+    wylosowane (poziomem wierzchołka może być długość najdłuższej ścieżki,
+    która się w nim kończy), ale nie wszystkie z tym samym
+    prawdopodobieństwem. Długość najdłuższej ścieżki jest liczona w czasie
+    O(n + m) po wierzchołkach posortowanych według poziomów.
+
+    :param G: Graph
+        Graf, którego skierowania są losowane.
+    :param max_path_len: Int
+        Największa długość ścieżki skierowanej w wyjściowych grafach.
+    :param count: Int
+        Liczba losowanych skierowań.
+    :param max_attempts: Int
+        Liczba prób wylosowania poziomów dla jednego skierowania, po której
+        rzucany jest ValueError (np. gdy G nie ma żadnego takiego
+        skierowania).
+    :return: list
+        Lista par (acykliczny graf skierowany, długość jego najdłuższej
+        ścieżki skierowanej).
+    '''
+    vertices = G.vertices()
+    index = {v: i for i, v in enumerate(vertices)}
+    edges = [(index[u], index[v]) for u, v in G.edges(labels=False)]
+    neighbors = [[] for _ in vertices]
+    for u, v in edges:
+        neighbors[u].append(v)
+        neighbors[v].append(u)
+
+    result = []
+    for _ in range(count):
+        levels = _random_levels(neighbors, max_path_len, max_attempts)
+        oriented = [(u, v) if levels[u] < levels[v] else (v, u)
+                    for u, v in edges]
+        out_neighbors = [[] for _ in vertices]
+        for u, v in oriented:
+            out_neighbors[u].append(v)
+        length = [0] * len(vertices)
+        for u in sorted(range(len(vertices)), key=levels.__getitem__):
+            for v in out_neighbors[u]:
+                length[v] = max(length[v], length[u] + 1)
+        DiG = DiGraph([vertices, [(vertices[u], vertices[v])
+                                  for u, v in oriented]],
+                      format='vertices_and_edges')
+        result.append((DiG, max(length, default=0)))
+    return result
+
+
 def random_orientation(G, max_path_len):
     '''Funkcja tworząca losowe acykliczne skierowanie grafu `G`,
     którego długość najdłuższej ścieżki skierowanej jest mniejsza lub równa
-    `max_path_len`.
+    `max_path_len` (patrz `random_orientations`).
 
     :param G: Graph
         Graf, którego skierowanie jest losowane.
@@ -188,19 +274,146 @@ def random_orientation(G, max_path_len):
         Para składająca się z acyklicznego grafu skierowanego, oraz długości
         jego najdłuższej ścieżki skierowanej.
     '''
-    good_orientation = False
-    while not good_orientation:
-        DiG = G.random_orientation()
-        longest_path_len = len(DiG.longest_path().edges())
-        good_orientation = \
-            DiG.is_directed_acyclic() and longest_path_len <= max_path_len
-    return DiG, longest_path_len
+    return random_orientations(G, max_path_len, 1)[0]
+
+
+def _batches(iterator, batch_size):
+    '''Dzieli elementy iteratora na listy o długości `batch_size` (ostatnia
+    może być krótsza).
+    '''
+    iterator = iter(iterator)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def graph_features(G):
+    '''Zwraca cechy grafu G zapisywane razem z wynikiem: trójkę (liczba
+    wierzchołków, liczba krawędzi, liczba trójkątów w grafie
+    nieskierowanym powstałym z G).
+    '''
+    G = CompactDiGraph.from_digraph(G)
+    neighbors = [set(G.neighbors_out(v)) | set(G.neighbors_in(v))
+                 for v in G.vertices()]
+    triangles = sum(len(neighbors[u] & neighbors[v])
+                    for u, v in G.edge_iterator()) // 3
+    return G.order(), G.size(), triangles
+
+
+def parse_result(line):
+    '''Zamienia linijkę pliku wyników na czwórkę (graf w formacie dig6,
+    kompresyjność, długość najdłuższej ścieżki, cechy grafu - patrz
+    `graph_features`). W plikach zapisanych przed dodaniem cech grafu
+    linijki nie zawierają cech - są one wtedy wyznaczane z grafu.
+    '''
+    fields = line.split()
+    graph, compressibility, longest_path_len = fields[:3]
+    if len(fields) == 6:
+        features = tuple(int(field) for field in fields[3:])
+    else:
+        features = graph_features(CompactDiGraph.from_dig6(graph))
+    return graph, parse_compressibility(compressibility), \
+        int(longest_path_len), features
+
+
+def read_results(path):
+    '''Czyta wyniki zapisane w pliku `path` przez `check_compressibility_many`
+    bez modyfikowania pliku. Niedokończona ostatnia linijka (np. zapisywana
+    właśnie przez trwające obliczenia) jest pomijana.
+
+    :return: list
+        Lista czwórek zwracanych przez `parse_result`.
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as file:
+        content = file.read()
+    return _parse_results(content[:content.rfind(b'\n') + 1])
+
+
+def _read_results(path):
+    '''Czyta wyniki tak jak `read_results`, ale niedokończona ostatnia
+    linijka (np. po przerwaniu zapisu) jest usuwana z pliku. Używana tylko
+    przy wznawianiu obliczeń.
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb+') as file:
+        content = file.read()
+        complete = content[:content.rfind(b'\n') + 1]
+        if len(complete) != len(content):
+            file.truncate(len(complete))
+    return _parse_results(complete)
+
+
+def _parse_results(content):
+    return [parse_result(line)
+            for line in content.decode('ascii').splitlines()]
+
+
+def parse_compressibility(text):
+    '''Zamienia kompresyjność zapisaną w pliku wyników na liczbę, lub na
+    CompressibilityInterval, jeżeli zapisany jest przedział postaci
+    "<lower>:<upper>" (wynik obliczeń przerwanych po przekroczeniu budżetu).
+    '''
+    if ':' in text:
+        lower, upper = text.split(':')
+        return CompressibilityInterval(int(lower), int(upper))
+    return int(text)
+
+
+def _open_results(path, graphs_iterator, resume):
+    '''Przygotowuje plik wyników `path` do dopisywania kolejnych wyników.
+    Jeżeli `resume` jest True, to z `graphs_iterator` pobierane są grafy,
+    których wyniki są już zapisane (i porównywane z zapisanymi).
+
+    :return: tuple
+        Para (lista zapisanych wyników - par (kompresyjność, długość
+        najdłuższej ścieżki), plik otwarty do dopisywania).
+    '''
+    if not resume and os.path.exists(path):
+        os.remove(path)
+    result = []
+    for graph, compressibility, longest_path_len, _ in _read_results(path):
+        G, _ = next(graphs_iterator, (None, None))
+        if G is None or G.dig6_string() != graph:
+            raise ValueError("Grafy zwracane przez iterator różnią się od "
+                             "zapisanych w pliku %s." % path)
+        result.append((compressibility, longest_path_len))
+    return result, open(path, 'a')
+
+
+def _write_result(output, G, compressibility, longest_path_len):
+    if isinstance(compressibility, CompressibilityInterval):
+        compressibility = "%d:%d" % compressibility
+    output.write("%s %s %d %d %d %d\n"
+                 % ((G.dig6_string(), compressibility, longest_path_len) +
+                    graph_features(G)))
+
+
+def _sync(output):
+    '''Wymusza zapis pliku `output` na dysk.
+    '''
+    output.flush()
+    os.fsync(output.fileno())
 
 
 def check_compressibility_many(graphs_iterator, upper_bound,
-                               save_results=None):
+                               save_results=None, batch_size=None,
+                               cache=None, resume=True, time_budget=None,
+                               node_budget=None):
     '''Funkcja liczy kompresyjność dla grafów podanych na wejściu.
 
+    Wynik dla każdego grafu jest dopisywany do pliku `save_results` zaraz po
+    obliczeniu (z wymuszeniem zapisu na dysk), więc zapisane linijki są
+    jednocześnie znacznikiem postępu. Po przerwaniu obliczeń ponowne
+    wywołanie z tym samym plikiem i iteratorem pomija grafy, których wyniki
+    są już zapisane. Wymaga to, żeby iterator zwracał za każdym razem te same
+    grafy (np. losowane z ustalonym ziarnem) - jest to sprawdzane przez
+    porównanie grafów z zapisanymi.
+
     :param graphs_iterator:
         Iterator, za pomocą którego wytwarzane są kolejne grafy. Powinien
         zwracać parę `(G, i)`, gdzie `G` jest grafem skierowanym, a `i` jest
@@ -208,34 +421,210 @@ def check_compressibility_many(graphs_iterator, upper_bound,
     :param save_results: string
         Plik, do którego zapisane zostaną dane w postaci
         "<graf w formacie dig6> <kompresyjność grafu>\
-         <długość najdłuższej ścieżki w grafie>"
-        linijka po linijce
+         <długość najdłuższej ścieżki w grafie> <liczba wierzchołków>\
+         <liczba krawędzi> <liczba trójkątów>"
+        linijka po linijce (cechy grafu - patrz `graph_features` - są
+        wyznaczane raz, przy zapisie, żeby nie trzeba było ich liczyć przy
+        rysowaniu wykresów)
     :param upper_bound: Int
         Liczba, do której jest liczona kompresyjność. Jeżeli okaże się, że jest
         ona wyższa, to zwracane jest -1.
+    :param batch_size: Int
+        Jeżeli nie jest None, to grafy są przetwarzane w grupach tej wielkości
+        za pomocą `compressibility_numbers`, dzięki czemu turnieje z każdego
+        poziomu są czytane raz na grupę, a nie raz na graf. Wyniki są wtedy
+        zapisywane po każdej grupie.
+    :param cache: string
+        Ścieżka do pliku pamięci podręcznej wyników (patrz
+        `CompressibilityCache`). Wykorzystywana tylko, gdy batch_size jest
+        None.
+    :param resume: bool
+        Jeżeli False, to istniejący plik `save_results` jest nadpisywany
+        zamiast wznawiania obliczeń.
+    :param time_budget: Float
+    :param node_budget: Int
+        Budżet obliczeń dla każdego grafu (patrz `compressibility_number`).
+        Jeżeli zostanie przekroczony, to zamiast kompresyjności zapisywany
+        jest przedział CompressibilityInterval (w pliku jako
+        "<lower>:<upper>"). Nie można ich używać razem z batch_size.
     :return: list
         Lista o długości równej liczbie wygenerowanych grafów składająca się z
         tupli (kompresyjnośc grafu, długość najdłuższej ścieżki w grafie).
         Górna granica, do której sprawdzana jest kompresyjność to 9, ze względu
         bardzo długi czas trwania obliczeń powyżej tej liczby.
     '''
+    if batch_size is not None and \
+            (time_budget is not None or node_budget is not None):
+        raise ValueError("Budżet obliczeń nie może być używany razem z "
+                         "batch_size.")
+    graphs_iterator = iter(graphs_iterator)
     result = []
+    output = None
     if save_results is not None:
-        graphs = []
-    for G, longest_path_len in graphs_iterator:
-        if save_results is not None:
-            graphs.append(G.dig6_string())
-        compressibility = compressibility_number(G, upper_bound=upper_bound)
+        result, output = _open_results(save_results, graphs_iterator, resume)
+
+    def save(G, compressibility, longest_path_len):
         result.append((compressibility, longest_path_len))
-    if save_results is not None:
-        lines_to_write = ["%s %d %d\n" % (graphs[i], result[i][0],
-                                          result[i][1])
-                          for i in range(len(graphs))]
-        file = open(save_results, 'w')
-        file.writelines(lines_to_write)
+        if output is not None:
+            _write_result(output, G, compressibility, longest_path_len)
+
+    def sync():
+        if output is not None:
+            _sync(output)
+
+    opened_cache = None
+    try:
+        if batch_size is None:
+            if cache is not None:
+                opened_cache = CompressibilityCache(cache)
+            for G, longest_path_len in graphs_iterator:
+                save(G, compressibility_number(G, upper_bound=upper_bound,
+                                               cache=opened_cache,
+                                               time_budget=time_budget,
+                                               node_budget=node_budget),
+                     longest_path_len)
+                sync()
+        else:
+            for batch in _batches(graphs_iterator, batch_size):
+                compressibilities = compressibility_numbers(
+                    [G for G, _ in batch], upper_bound=upper_bound)
+                for compressibility, (G, longest_path_len) in \
+                        zip(compressibilities, batch):
+                    save(G, compressibility, longest_path_len)
+                sync()
+    finally:
+        if opened_cache is not None:
+            opened_cache.close()
+        if output is not None:
+            output.close()
     return result
 
 
+_worker_cache = None  # pamięć podręczna wyników w procesie roboczym
+
+
+def _init_experiment_worker(cache_path):
+    global _worker_cache
+    _worker_cache = CompressibilityCache(cache_path) if cache_path else None
+
+
+def _experiment_task(args):
+    graph, upper_bound, time_budget, node_budget = args
+    return compressibility_number(CompactDiGraph.from_dig6(graph),
+                                  upper_bound=upper_bound,
+                                  cache=_worker_cache,
+                                  time_budget=time_budget,
+                                  node_budget=node_budget)
+
+
+def run_experiments(cells, upper_bound, workers=None, max_pending=None,
+                    cache=None, resume=True, time_budget=None,
+                    node_budget=None):
+    '''Liczy kompresyjność grafów z wielu komórek eksperymentu jednocześnie.
+    Każdy graf jest osobnym zadaniem wykonywanym przez jeden z `workers`
+    procesów, które pobierają kolejne zadania ze wspólnej kolejki, gdy tylko
+    skończą poprzednie. Czas obliczeń zależy więc od liczby procesów, a nie
+    od najwolniejszej komórki.
+
+    Grafy są pobierane z iteratorów dopiero wtedy, gdy liczba wysłanych i
+    jeszcze nie zapisanych grafów jest mniejsza od `max_pending`. Wyniki
+    każdej komórki są zapisywane do jej pliku w kolejności grafów, tak jak
+    w `check_compressibility_many` (z tym samym sposobem wznawiania).
+
+    :param cells: dict
+        Słownik {ścieżka do pliku wyników: iterator grafów}. Iteratory są
+        takie same jak w `check_compressibility_many`.
+    :param upper_bound: Int
+        Górna granica, powyżej której kompresyjność nie jest sprawdzana.
+    :param workers: Int
+        Liczba procesów (domyślnie liczba procesorów).
+    :param max_pending: Int
+        Największa liczba grafów przetwarzanych jednocześnie (domyślnie
+        4 * workers).
+    :param cache: string
+        Ścieżka do pliku pamięci podręcznej wyników (patrz
+        `CompressibilityCache`) współdzielonej przez procesy.
+    :param resume: bool
+    :param time_budget: Float
+    :param node_budget: Int
+        Jak w `check_compressibility_many`.
+    :return: dict
+        Słownik {ścieżka do pliku wyników: lista par (kompresyjność,
+        długość najdłuższej ścieżki)}.
+    '''
+    workers = os.cpu_count() if workers is None else workers
+    max_pending = 4 * workers if max_pending is None else max_pending
+    iterators = {path: iter(graphs) for path, graphs in cells.items()}
+    results = {}
+    outputs = {}
+    buffers = {}  # ścieżka -> {numer grafu: wynik}, nie zapisane jeszcze
+    done = queue.Queue()
+
+    # Komórki są otwierane (i wznawiane) po kolei, dopiero gdy są potrzebne
+    # - iteratory losujące grafy z ustalonym ziarnem zwracają wtedy te same
+    # grafy, co przy obliczeniach bez przerw.
+    def tasks():
+        for path, graphs in iterators.items():
+            results[path], outputs[path] = _open_results(path, graphs,
+                                                         resume)
+            buffers[path] = {}
+            for index, (G, longest_path_len) in \
+                    enumerate(graphs, start=len(results[path])):
+                yield path, index, G, longest_path_len
+
+    # wywoływane w wątku puli, który odbiera wyniki od procesów
+    def finished(task):
+        return lambda result: done.put((task, result, None))
+
+    def failed(error):
+        done.put((None, None, error))
+
+    def handle(item):
+        task, compressibility, error = item
+        if error is not None:
+            raise error
+        path, index, G, longest_path_len = task
+        buffer = buffers[path]
+        buffer[index] = (G, compressibility, longest_path_len)
+        # zapisywane są tylko wyniki następujące po już zapisanych
+        while len(results[path]) in buffer:
+            G, compressibility, longest_path_len = \
+                buffer.pop(len(results[path]))
+            results[path].append((compressibility, longest_path_len))
+            _write_result(outputs[path], G, compressibility,
+                          longest_path_len)
+        _sync(outputs[path])
+
+    pool = None
+    try:
+        pool = mp.Pool(workers, initializer=_init_experiment_worker,
+                       initargs=(cache,))
+        pending = 0
+        for task in tasks():
+            while pending >= max_pending:
+                handle(done.get())
+                pending -= 1
+            pool.apply_async(_experiment_task,
+                             ((task[2].dig6_string(), upper_bound,
+                               time_budget, node_budget),),
+                             callback=finished(task), error_callback=failed)
+            pending += 1
+        while pending > 0:
+            handle(done.get())
+            pending -= 1
+        pool.close()
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+        for output in outputs.values():
+            output.close()
+    return results
+
+
 def plot_graphs(file_in, dir_out, compressibility=None, path_len=None,
                 compr_path_diff=None):
     '''Funkcja rysująca grafy, które zostały zapisane w pliku 'file_in' i
@@ -262,9 +651,9 @@ def plot_graphs(file_in, dir_out, compressibility=None, path_len=None,
     if dir_out[-1] != '/':
         dir_out += "/"
     for line in file:
-        graph, comp, path = line.split()
-        comp = int(comp)
-        path = int(path)
+        graph, comp, path, _ = parse_result(line)
+        if isinstance(comp, CompressibilityInterval):
+            continue
         if compressibility is not None:
             if comp not in compressibility:
                 continue
@@ -1,9 +1,8 @@
 '''
-Plik, za pomocą którego tworzone są pliki w katalogu 'tournaments'.
+Plik, za pomocą którego tworzone są pliki w katalogu 'tournaments'. Opis
+sposobu generowania znajduje się w pliku tournament_generation.py.
 '''
-import sage.all
-from sage.graphs.digraph_generators import digraphs
-
+import argparse
 import sys
 import os
 from tqdm import tqdm
@@ -11,34 +10,29 @@ from tqdm import tqdm
 PATH = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, PATH + "/..")
 
-from src.helpers import *
+from src.tournament_generation import generate_level
+from src.tournament_store import TOURNAMENTS_PATH
+from src.tournament_lattice import build_lattice, lattice_path
 
 if __name__ == '__main__':
-    graphs_counts = [1, 1, 2, 4, 12, 56, 456, 6880, 191536, 9733056]
-    if not os.path.exists(PATH + "/../tournaments"):
-        os.mkdir(PATH + "/../tournaments")
-    if not os.path.exists(PATH + "/../tournaments/one_cycle"):
-        os.mkdir(PATH + "/../tournaments/one_cycle")
-    if not os.path.exists(PATH + "/../tournaments/more_cycles"):
-        os.mkdir(PATH + "/../tournaments/more_cycles")
-    for i in range(1, 11):
-        one = []
-        more = []
-        transitive = False  # czy już napotkany był turniej tranzytywny
-        print("Generating graphs with %d vertices..." % i)
-        for H in tqdm(digraphs.tournaments_nauty(i),
-                      total=graphs_counts[i - 3],file=sys.stdout):
-            if not transitive and H.is_transitive():
-                transitive = True
-                continue
-            if has_exactly_one_cycle_tournament(H):
-                one.append(H.dig6_string() + '\n')
-            else:
-                more.append(H.dig6_string() + '\n')
+    graphs_counts = [1, 1, 2, 4, 12, 56, 456, 6880, 191536, 9733056,
+                     903753248]
+    parser = argparse.ArgumentParser(
+        description="Generowanie turniejów o co najwyżej n wierzchołkach.")
+    parser.add_argument('n', type=int, nargs='?', default=10)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="liczba procesów generujących turnieje")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="liczba fragmentów, na które dzielone są "
+                        "turnieje o danej liczbie wierzchołków")
+    args = parser.parse_args()
 
-        print("Saving to files...")
-        file = open(PATH + "/../tournaments/one_cycle/%d.dig6" % i, 'w')
-        file.writelines(one)
-
-        file = open(PATH + "/../tournaments/more_cycles/%d.dig6" % i, 'w')
-        file.writelines(more)
+    for i in range(1, args.n + 1):
+        print("Generating graphs with %d vertices..." % i)
+        with tqdm(total=graphs_counts[i - 1] - 1, file=sys.stdout) as bar:
+            if not generate_level(i, TOURNAMENTS_PATH, args.shards,
+                                  args.workers, bar.update):
+                print("Already generated.")
+        if i >= 2 and not os.path.exists(lattice_path(i)):
+            print("Building lattice for %d vertices..." % i)
+            build_lattice(i)
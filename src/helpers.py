@@ -1,19 +1,25 @@
-import sage.all
-from sage.graphs.digraph import DiGraph
-from sage.graphs.digraph_generators import digraphs
-
 from src.DiGraphExtended import DiGraphExtended
+from src.tournament_store import TournamentStore, store_path, \
+    unpack_tournament, dig6_to_bits, peeling_plan, decode_plan, \
+    pack_tournament, PeelingPlan, PLAN_MAGIC, one_cycle_tournaments
 
-from copy import deepcopy
+from functools import lru_cache
+from itertools import islice
 import os
 
 '''
-Plik zawierający funkcje pomocnicze
+Plik zawierający funkcje pomocnicze. Sage jest importowany dopiero przez
+funkcje, które tworzą obiekty DiGraph, więc pozostałe funkcje (a także
+obliczenia kompresyjności) mogą być używane bez ładowania Sage.
 '''
 
 
 PATH = os.path.dirname(os.path.abspath(__file__))
 
+# (liczba wierzchołków, klasa) -> lista wyników `tournament_plans` wczytanych
+# do pamięci przez `preload_tournaments`
+_preloaded = {}
+
 
 def iterator_has_exactly_one_element(it):
     '''Zwraca True wtw iterator it ma dokładnie jeden element.
@@ -29,21 +35,167 @@ def iterator_has_exactly_one_element(it):
     return False
 
 
-def tournament_iterator(i, cycles):
+def tournament_iterator(i, cycles, start=0, stop=None):
     '''Iterator po grafach o jednym, lub co najmniej dwóch cyklach skierowanych
-    (w zależności od parametru cycles).
+    (w zależności od parametru cycles). Jeżeli istnieje plik binarny
+    (patrz `tournament_store.py`), to turnieje są czytane z niego. W
+    przeciwnym przypadku czytany jest plik w formacie dig6. Jeżeli nie ma
+    żadnego z plików, to turnieje o jednym cyklu są konstruowane przez
+    `one_cycle_tournaments`.
 
     :param i: Int
         Liczba wierzchołków grafu
     :param cycles: string
         'one_cycle' lub 'more_cycles'
+    :param start: Int
+        Indeks pierwszego zwracanego turnieju.
+    :param stop: Int
+        Indeks, przed którym iteracja się kończy. Jeżeli None, to iteracja
+        trwa do końca pliku.
     :return: DiGraph
         Kolejne grafy skierowane.
     '''
-    file = open(PATH + "/../tournaments/" + cycles + "/%d.dig6" % i, 'r')
-    lines = file.readlines()
-    for line in lines:
-        yield DiGraph(line, format="dig6")
+    if os.path.exists(store_path(i, cycles)):
+        with TournamentStore(store_path(i, cycles)) as store:
+            for bits in store.records(start, stop):
+                yield unpack_tournament(bits, i)
+        return
+    if _constructed(i, cycles):
+        for bits in islice(one_cycle_tournaments(i), start, stop):
+            yield unpack_tournament(bits, i)
+        return
+
+    from sage.graphs.digraph import DiGraph
+    with open(store_path(i, cycles, 'dig6'), 'r') as file:
+        for line in islice(file, start, stop):
+            yield DiGraph(line, format="dig6")
+
+
+def tournament_bits(i, cycles, start=0, stop=None):
+    '''Iterator po turniejach takich jak w `tournament_iterator`, który
+    zwraca bity orientacji turniejów (patrz `tournament_store.py`) zamiast
+    obiektów DiGraph.
+    '''
+    if os.path.exists(store_path(i, cycles)):
+        with TournamentStore(store_path(i, cycles)) as store:
+            yield from store.records(start, stop)
+        return
+    if _constructed(i, cycles):
+        yield from islice(one_cycle_tournaments(i), start, stop)
+        return
+
+    with open(store_path(i, cycles, 'dig6'), 'r') as file:
+        for line in islice(file, start, stop):
+            yield dig6_to_bits(line)[1]
+
+
+def tournament_plans(i, cycles, start=0, stop=None):
+    '''Iterator po turniejach takich jak w `tournament_iterator`, który
+    zamiast obiektów DiGraph zwraca pary (zbiór krawędzi turnieju jako maska
+    bitowa - patrz `edge_set_bitmask`, plan usuwania źródeł i ujść - patrz
+    `PeelingPlan`). Plany są czytane z pliku `<i>.plan`, a jeżeli go nie ma,
+    to są wyznaczane na bieżąco. Jeżeli turnieje zostały wczytane przez
+    `preload_tournaments`, to pliki nie są czytane.
+    '''
+    if (i, cycles) in _preloaded:
+        plans = _preloaded[(i, cycles)]
+        stop = len(plans) if stop is None else min(stop, len(plans))
+        for k in range(start, stop):
+            yield plans[k]
+        return
+
+    if os.path.exists(store_path(i, cycles)):
+        with TournamentStore(store_path(i, cycles)) as store:
+            records = store.records(start, stop)
+            if os.path.exists(store_path(i, cycles, 'plan')):
+                with TournamentStore(store_path(i, cycles, 'plan'),
+                                     PLAN_MAGIC) as plans:
+                    for bits, plan in zip(records,
+                                          plans.records(start, stop)):
+                        yield tournament_edge_set(bits, i), \
+                            decode_plan(plan, i)
+                return
+            for bits in records:
+                yield tournament_edge_set(bits, i), \
+                    decode_plan(peeling_plan(bits, i), i)
+        return
+    if _constructed(i, cycles):
+        for bits in islice(one_cycle_tournaments(i), start, stop):
+            yield tournament_edge_set(bits, i), \
+                decode_plan(peeling_plan(bits, i), i)
+        return
+
+    with open(store_path(i, cycles, 'dig6'), 'r') as file:
+        for line in islice(file, start, stop):
+            _, bits = dig6_to_bits(line)
+            yield tournament_edge_set(bits, i), \
+                decode_plan(peeling_plan(bits, i), i)
+
+
+def tournament_count(i, cycles):
+    '''Zwraca liczbę turniejów o `i` wierzchołkach z klasy `cycles`.
+    '''
+    if (i, cycles) in _preloaded:
+        return len(_preloaded[(i, cycles)])
+    if os.path.exists(store_path(i, cycles)):
+        with TournamentStore(store_path(i, cycles)) as store:
+            return len(store)
+    if _constructed(i, cycles):
+        return max(0, i - 2)
+    with open(store_path(i, cycles, 'dig6'), 'r') as file:
+        return sum(1 for _ in file)
+
+
+def max_tournament_order():
+    '''Zwraca największe n takie, że turnieje o co najwyżej n wierzchołkach
+    (z obu klas) są dostępne - w plikach lub wczytane do pamięci.
+    '''
+    n = 0
+    while True:
+        try:
+            for cycles in ['one_cycle', 'more_cycles']:
+                tournament_count(n + 1, cycles)
+        except FileNotFoundError:
+            return n
+        n += 1
+
+
+def _constructed(i, cycles):
+    '''Zwraca True wtw turnieje o `i` wierzchołkach z klasy `cycles` nie są
+    zapisane w plikach, ale mogą być skonstruowane (turnieje o jednym cyklu).
+    '''
+    return cycles == 'one_cycle' and \
+        not os.path.exists(store_path(i, cycles)) and \
+        not os.path.exists(store_path(i, cycles, 'dig6'))
+
+
+def preload_tournaments(max_order, classes=('one_cycle', 'more_cycles')):
+    '''Wczytuje do pamięci zbiory krawędzi i plany usuwania źródeł i ujść
+    (wraz z zredukowanymi turniejami) wszystkich turniejów o co najwyżej
+    `max_order` wierzchołkach. Później `tournament_plans` i
+    `tournament_count` nie czytają plików. Poziomy, dla których nie ma
+    plików, są pomijane.
+
+    :return: Int
+        Liczba wczytanych turniejów.
+    '''
+    count = 0
+    for cycles in classes:
+        for i in range(1, max_order + 1):
+            if (i, cycles) not in _preloaded:
+                if not os.path.exists(store_path(i, cycles)) and \
+                        not os.path.exists(store_path(i, cycles, 'dig6')) \
+                        and not _constructed(i, cycles):
+                    continue
+                _preloaded[(i, cycles)] = list(tournament_plans(i, cycles))
+            count += len(_preloaded[(i, cycles)])
+    return count
+
+
+def unload_tournaments():
+    '''Usuwa z pamięci turnieje wczytane przez `preload_tournaments`.
+    '''
+    _preloaded.clear()
 
 
 def has_exactly_one_cycle_tournament(G):
@@ -88,6 +240,7 @@ def tournament_with_one_cycle(k, sink):
     if len(sink) != k - 3:
         raise ValueError("Długość tablicy sink musi być równa k-3")
 
+    from sage.graphs.digraph import DiGraph
     T = DiGraph()
     T.add_cycle([0, 2, 1])
 
@@ -128,8 +281,8 @@ def rm_sinks_and_sources(G, T, keep_T=False, G_degrees=None, G_vertices=None):
         da niepoprawny wynik!
     '''
 
-    exG = DiGraphExtended(G, keep_removed=True, degrees=deepcopy(G_degrees),
-                          vertices=deepcopy(G_vertices))
+    exG = DiGraphExtended(G, keep_removed=True, degrees=G_degrees,
+                          vertices=G_vertices)
 
     T_vertices = {'sink': T.sinks(), 'source': T.sources()}
     if len(T_vertices['sink']) == 0 and len(T_vertices['source']) == 0:
@@ -157,6 +310,80 @@ def rm_sinks_and_sources(G, T, keep_T=False, G_degrees=None, G_vertices=None):
             pass
 
 
+def edge_set_bitmask(edges):
+    '''Zwraca zbiór krawędzi skierowanych (par liczb naturalnych) jako maskę
+    bitową. Numeracja bitów nie zależy od liczby wierzchołków grafu: para
+    {a, b}, a < b, otrzymuje numer p = b(b-1)/2 + a, a krawędzi a -> b
+    odpowiada bit 2p, zaś krawędzi b -> a bit 2p + 1. Dzięki temu zawieranie
+    etykietowanych grafów różnych rozmiarów sprowadza się do zawierania masek.
+
+    :param edges: iterable
+        Krawędzie grafu, np. `G.edge_iterator(labels=False)`.
+    '''
+    mask = 0
+    for u, v in edges:
+        if u < v:
+            mask |= 1 << (v * (v - 1) + 2 * u)
+        else:
+            mask |= 1 << (u * (u - 1) + 2 * v + 1)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _edge_set_tables(n):
+    '''Tablice pozwalające szybko zamienić bity orientacji turnieju o `n`
+    wierzchołkach na maskę `edge_set_bitmask`: maska wszystkich krawędzi
+    skierowanych od większego do mniejszego wierzchołka, oraz dla każdego
+    bajtu bitów orientacji tablica 256 poprawek, które trzeba od niej odjąć.
+    '''
+    positions = [j * (j - 1) + 2 * i
+                 for i in range(n) for j in range(i + 1, n)]
+    base = sum(1 << (q + 1) for q in positions)
+    tables = []
+    for b in range(0, len(positions), 8):
+        chunk = positions[b:b + 8]
+        tables.append([sum(1 << q for k, q in enumerate(chunk)
+                           if (byte >> k) & 1) for byte in range(256)])
+    return base, tables
+
+
+def tournament_edge_set(bits, n):
+    '''Zwraca maskę `edge_set_bitmask` turnieju o `n` wierzchołkach zapisanego
+    jako bity orientacji `bits` (patrz tournament_store.py).
+    '''
+    base, tables = _edge_set_tables(n)
+    for table in tables:
+        # bit 2p + 1 (krawędź j -> i) zamieniamy na bit 2p (krawędź i -> j)
+        base -= table[bits & 0xff]
+        bits >>= 8
+    return base
+
+
+def replay_plan(G, plan, G_degrees=None, G_vertices=None):
+    '''Wykonuje na kopii grafu G kroki planu `plan` (PeelingPlan), tak jak
+    robi to `rm_sinks_and_sources`, ale bez odwoływania się do turnieju.
+
+    :return: DiGraphExtended
+        Graf G z usuniętymi wierzchołkami.
+    '''
+    exG = DiGraphExtended(G, keep_removed=True, degrees=G_degrees,
+                          vertices=G_vertices)
+    for step in plan.steps:
+        try:
+            exG.step(step)
+        except RuntimeError:
+            pass
+    return exG
+
+
+def plan_from_graph(T):
+    '''Zwraca plan usuwania źródeł i ujść (PeelingPlan) dla turnieju T
+    zapisanego jako DiGraph.
+    '''
+    n = T.order()
+    return decode_plan(peeling_plan(pack_tournament(T), n), n)
+
+
 def transitive_tournament(n):
     '''Zwraca turniej tranzytywny, którego krawędzie są sierowane od
     wierzchołka o większym indeksie, do tego o większym.
@@ -164,5 +391,11 @@ def transitive_tournament(n):
     :param n: Rozmiar turnieju
     :return: Turniej tranzytywny
     '''
-    edges = [(j, i) for j in range(0, n) for i in range(0, j)]
-    return DiGraph(edges)
+    from sage.graphs.digraph import DiGraph
+    return DiGraph(transitive_tournament_edges(n))
+
+
+def transitive_tournament_edges(n):
+    '''Zwraca listę krawędzi turnieju tranzytywnego `transitive_tournament`.
+    '''
+    return [(j, i) for j in range(0, n) for i in range(0, j)]
@@ -1,42 +1,119 @@
-import sage.all
-from sage.graphs.digraph import DiGraph
-from sage.graphs.connectivity import \
-    connected_components_subgraphs, is_connected
-
 from src.helpers import *
+from src.CompactDiGraph import CompactDiGraph
+from src.tournament_lattice import KnownHomomorphic, node_offset
+from src.compressibility_stats import CompressibilityStats
+
+from collections import namedtuple
+import multiprocessing as mp
+import pickle
+import time
+
+
+# liczba ustawionych bitów dla liczb mniejszych od 2^16
+_POPCOUNT = [0] * (1 << 16)
+for _i in range(1, 1 << 16):
+    _POPCOUNT[_i] = _POPCOUNT[_i >> 1] + (_i & 1)
+
+
+class BudgetExceeded(Exception):
+    '''Wyjątek rzucany, gdy skończył się czas lub limit węzłów przeszukiwania
+    (patrz `Budget`).
+    '''
+
+
+class Budget():
+    '''Ograniczenie czasu działania i liczby węzłów odwiedzonych przez
+    przeszukiwanie w `Homomorphism.homomorphic_to_tournament`.
+
+    :param time_budget: Float
+        Czas (w sekundach, liczony od utworzenia obiektu) lub None.
+    :param node_budget: Int
+        Największa liczba węzłów przeszukiwania lub None.
+    '''
+
+    def __init__(self, time_budget=None, node_budget=None):
+        self.deadline = None if time_budget is None \
+            else time.monotonic() + time_budget
+        self.node_budget = node_budget
+
+    def check(self, nodes=0):
+        '''Rzuca BudgetExceeded, jeżeli liczba węzłów `nodes` przekracza
+        limit lub minął czas. Czas jest sprawdzany co 64 węzły.
+        '''
+        if self.node_budget is not None and nodes > self.node_budget:
+            raise BudgetExceeded()
+        if self.deadline is not None and nodes % 64 == 0 and \
+                time.monotonic() > self.deadline:
+            raise BudgetExceeded()
+
+
+CompressibilityInterval = namedtuple('CompressibilityInterval',
+                                     ['lower', 'upper'])
+CompressibilityInterval.__doc__ = '''Wynik `compressibility_number`
+przerwanego po przekroczeniu budżetu.
+
+:param lower: Int
+    Kompresyjność jest nie mniejsza niż `lower` - dla turniejów o mniej niż
+    `lower` wierzchołkach znaleziono turniej, z którym G nie jest
+    homomorficzny.
+:param upper: Int
+    Górna granica obliczeń (upper_bound) lub lepsze ograniczenie 2^(k-1),
+    gdzie k jest liczbą wierzchołków najdłuższej ścieżki w G (każdy turniej o
+    2^(k-1) wierzchołkach zawiera turniej tranzytywny o k wierzchołkach).
+    Jeżeli upper jest równe upper_bound, to kompresyjność może też być większa
+    od upper_bound.
+'''
 
 
 class Homomorphism():
     '''Klasa pomocnicza, przechowująca metody sprawdzające różnego rodzaju
     homomorfizmy.
+
+    Graf G po usunięciu źródeł i ujść zgodnie z planem turnieju zależy tylko
+    od kroków planu, więc jest wyznaczany raz dla każdej sekwencji kroków i
+    współdzielony przez wszystkie turnieje o tej sekwencji. Dla turniejów o
+    jednym cyklu (których zredukowaną częścią zawsze jest C_3) zapamiętywany
+    jest od razu wynik - wyznaczany jednocześnie dla wszystkich takich
+    turniejów danego rozmiaru (patrz `one_cycle_level`).
+
+    G jest przechowywany jako CompactDiGraph, więc obiekt tej klasy można
+    przesłać do procesu, który nie ładuje Sage.
+
+    :param G: DiGraph lub CompactDiGraph
+    :param engine: string
+        Algorytm używany przez `homomorphic_to_tournament`:
+        * 'csp' - przeszukiwanie ze spójnością łukową i wyborem zmiennej o
+          najmniejszej dziedzinie,
+        * 'backtrack' - przeszukiwanie z nawrotami w porządku topologicznym.
+        Liczba odwiedzonych węzłów jest sumowana w atrybucie `nodes`.
+        Jeżeli atrybut `budget` (Budget) nie jest None, to przeszukiwanie
+        rzuca BudgetExceeded po jego przekroczeniu.
     '''
 
-    def __init__(self, G):
-        self.G = G
-        self.degrees = {
-            'sink': G.out_degree(labels=True),
-            'source': G.in_degree(labels=True)
-        }
-        self._vertices = {
-            'sink': G.sinks(),
-            'source': G.sources()
-        }
+    ENGINES = ['csp', 'backtrack']
+
+    def __init__(self, G, engine='csp'):
+        if engine not in self.ENGINES:
+            raise ValueError("engine musi być równy 'csp' lub 'backtrack'.")
+        self.G = CompactDiGraph.from_digraph(G)
+        self.engine = engine
+        self.nodes = 0  # liczba węzłów odwiedzonych przez przeszukiwanie
+        self.budget = None
+        self._acyclic = None
+        self._longest_path = None
+        self._peeled = {}  # kroki planu -> (posortowany G, sąsiedztwa G)
+        self._one_cycle = {}  # kroki planu -> wynik is_homomorphic_one_cycle
 
     def is_homomorphic_to_C_three(self, G=None):
         '''Sprawdza, czy graf G jest homomorficzny z C_3. G nie musi być
-        spójny.
+        spójny - kolejne składowe są kolorowane bez tworzenia ich kopii.
 
         :param G: DiGraph
             Graf, którego homomorfizm jest sprawdzany. Jeżeli G jest None, to
             sprawdzany jest homomorfizm z self.G
         '''
-        if G is None:
-            G = self.G
-
-        for H in connected_components_subgraphs(G):
-            if not self.connected_is_homomorphic_to_C_three(H):
-                return False
-        return True
+        G = self.G if G is None else CompactDiGraph.from_digraph(G)
+        return self._color_C_three(G, range(G.order()))
 
     def connected_is_homomorphic_to_C_three(self, G=None):
         '''Sprawdza czy spójny G jest homomorficzny z C_3. Implementacja
@@ -46,174 +123,636 @@ class Homomorphism():
             Graf, którego homomorfizm jest sprawdzany. Jeżeli G jest None, to
             sprawdzany jest homomorfizm z self.G
         '''
-        if G is None:
-            G = self.G
-
-        if not is_connected(G):
+        G = self.G if G is None else CompactDiGraph.from_digraph(G)
+        if not G.is_connected():
             raise ValueError("G musi być grafem spójnym.")
 
-        colors = {}
-
-        def color(v, i):
-            if v in colors:
-                if colors[v] != i:
-                    return False
-                else:
-                    return True
+        return self._color_C_three(G, [0])
 
-            colors[v] = i
-            for w in G.neighbors_in(v):
-                next_color = (i - 1) % 3
-                if not color(w, next_color):
-                    return False
+    @staticmethod
+    def _color_C_three(G, starts, size=None):
+        '''Koloruje wierzchołki G (CompactDiGraph) kolorami 0, 1, 2 tak, żeby
+        każda krawędź prowadziła od koloru i do koloru (i + 1) mod 3.
+        Kolorowanie odbywa się iteracyjnie (bez rekurencji), rozpoczynając od
+        kolejnych jeszcze niepokolorowanych wierzchołków ze `starts`.
 
-            for w in G.neighbors_out(v):
-                next_color = (i + 1) % 3
-                if not color(w, next_color):
-                    return False
+        :param size: Int
+            Liczba numerów wierzchołków (domyślnie G.order()). Pozwala
+            kolorować DiGraphExtended, którego wierzchołkami są numery
+            wierzchołków CompactDiGraph.
+        :return: bool
+            True wtw kolorowanie się powiodło (G jest homomorficzny z C_3).
+        '''
+        colors = [-1] * (G.order() if size is None else size)
+        for start in starts:
+            if colors[start] != -1:
+                continue
+            colors[start] = 0
+            stack = [start]
+            while stack:
+                v = stack.pop()
+                for neighbors, shift in [(G.neighbors_in(v), 2),
+                                         (G.neighbors_out(v), 1)]:
+                    next_color = (colors[v] + shift) % 3
+                    for w in neighbors:
+                        if colors[w] == -1:
+                            colors[w] = next_color
+                            stack.append(w)
+                        elif colors[w] != next_color:
+                            return False
+        return True
 
-            return True
+    def _check_acyclic(self):
+        '''Rzuca ValueError, jeżeli G nie jest acykliczny. Wynik sprawdzenia
+        jest zapamiętywany.
+        '''
+        if self._acyclic is None:
+            self._acyclic = self.G.is_directed_acyclic()
+        if not self._acyclic:
+            raise ValueError("G musi być skierowany i acykliczny.")
 
-        return color(G.vertices()[0], 0)
+    def _peel(self, plan):
+        '''Usuwa z kopii G źródła i ujścia zgodnie z `plan`. Zwraca parę
+        list (sąsiedztwa wychodzące, sąsiedztwa wchodzące) pozostałych
+        wierzchołków, które są numerowane zgodnie z porządkiem topologicznym.
+        Wynik jest zapamiętywany dla każdej sekwencji kroków.
+        '''
+        if plan.steps not in self._peeled:
+            G = replay_plan(self.G, plan)
+            if G.current_vertex_count() == 0:
+                self._peeled[plan.steps] = ([], [])
+            else:
+                sorted_G = G.topological_sort()
+                index = {v: j for j, v in enumerate(sorted_G)}
+                G_out = [[index[w] for w in G.neighbors_out(v)]
+                         for v in sorted_G]
+                G_in = [[] for _ in sorted_G]
+                for j, neighbors in enumerate(G_out):
+                    for k in neighbors:
+                        G_in[k].append(j)
+                self._peeled[plan.steps] = (G_out, G_in)
+        return self._peeled[plan.steps]
 
-    def is_homomorphic_one_cycle(self, T):
+    def is_homomorphic_one_cycle(self, T=None, plan=None):
         '''Sprawdza czy G jest homomorficzny z turniejem T.
         T musi zawierać dokładnie jeden cykl skierowany. W
         przeciwnym przypadku rzucany jest ValueError
+
+        :param plan: PeelingPlan
+            Plan usuwania źródeł i ujść T. Jeżeli jest podany, to T nie jest
+            używany (i może być None).
         '''
-        if not self.G.is_directed_acyclic():
-            raise ValueError("G musi być skierowany i acykliczny.")
-        if not has_exactly_one_cycle_tournament(T) or not T.is_tournament():
+        self._check_acyclic()
+        if plan is None:
+            if not has_exactly_one_cycle_tournament(T) or \
+                    not T.is_tournament():
+                raise ValueError("T musi być turniejem i zawierać dokładnie "
+                                 "jeden cykl skierowany.")
+            plan = plan_from_graph(T)
+        elif len(plan.core) != 3:
             raise ValueError("T musi być turniejem i zawierać dokładnie "
                              "jeden cykl skierowany.")
 
-        G = rm_sinks_and_sources(self.G, T, G_vertices=self._vertices,
-                                 G_degrees=self.degrees).get_current()
-        # to co zostało, to pewien graf G, oraz T będący cyklem C_3
-        return self.is_homomorphic_to_C_three(G)
+        if plan.steps not in self._one_cycle:
+            # wyniki dla wszystkich turniejów o jednym cyklu tego rozmiaru
+            self._one_cycle.update(
+                self.one_cycle_level(len(plan.steps) + 3))
+        if plan.steps not in self._one_cycle:
+            G = replay_plan(self.G, plan).get_current()
+            # to co zostało, to pewien graf G, oraz T będący cyklem C_3
+            self._one_cycle[plan.steps] = self.is_homomorphic_to_C_three(G)
+        return self._one_cycle[plan.steps]
+
+    def one_cycle_level(self, i):
+        '''Sprawdza homomorfizm G z każdym turniejem o jednym cyklu i `i`
+        wierzchołkach.
+
+        Plan takiego turnieju to a kroków 'source', a po nich b kroków
+        'sink' (a + b = i - 3), więc plany tworzą drzewo o wspólnych
+        prefiksach: ścieżkę kroków 'source', od której odchodzą ścieżki
+        kroków 'sink'. Drzewo jest przechodzone w głąb na jednej kopii G
+        (DiGraphExtended), a kroki są cofane przy powrocie (`undo`).
+        Kolorowanie C_3 jest wykonywane tylko w liściach, na pozostałych
+        wierzchołkach G.
+
+        :return: dict
+            Słownik {kroki planu: bool} dla wszystkich i - 2 turniejów.
+        '''
+        self._check_acyclic()
+        if i < 3:
+            return {}
+        k = i - 3
+        G = DiGraphExtended(self.G, keep_removed=True)
+        size = self.G.order()
+        applied = []  # czy kolejne kroki na ścieżce usunęły wierzchołki
+
+        def push(step):
+            try:
+                G.step(step)
+                applied.append(True)
+            except RuntimeError:
+                applied.append(False)
+
+        def pop():
+            if applied.pop():
+                G.undo()
+
+        verdicts = {}
+        for a in range(k + 1):
+            if a > 0:
+                push('source')
+            for _ in range(k - a):
+                push('sink')
+            verdicts[('source',) * a + ('sink',) * (k - a)] = \
+                self._color_C_three(G, G.vertices(), size)
+            for _ in range(k - a):
+                pop()
+        return verdicts
+
+    def longest_path_order(self):
+        '''Zwraca liczbę wierzchołków najdłuższej ścieżki skierowanej w G.
+        Wynik jest liczony raz, w czasie O(n + m), za pomocą programowania
+        dynamicznego po porządku topologicznym.
+        '''
+        self._check_acyclic()
+        if self._longest_path is None:
+            length = [1] * self.G.order()
+            for v in self.G.topological_sort():
+                for w in self.G.neighbors_out(v):
+                    if length[w] < length[v] + 1:
+                        length[w] = length[v] + 1
+            self._longest_path = max(length, default=0)
+        return self._longest_path
 
     def is_homomorphic_to_transitive_k(self, k):
         '''Funkcja zwraca True wtw G jest homomorficzny z turniejem
-        tranzytywnym na k wierzchołkach.
+        tranzytywnym na k wierzchołkach, czyli wtw najdłuższa ścieżka
+        skierowana w G ma co najwyżej k wierzchołków.
         '''
-        if not self.G.is_directed_acyclic():
-            raise ValueError("G musi być skierowany i acykliczny.")
-        # krawędzie w T są skierowane od wierzchołka o mniejszym
-        # indeksie do wierzchołka o większym indeksie
-        colors = dict()  # kolory przyporządkowane wierzchołkom
-        color = k  # obecny kolor
-        vertices = self.G.sinks()  # wierzchołki, które w danym obrocie pętli
-        # będą kolorowane
-        ex = DiGraphExtended(self.G)
-
-        while len(vertices) > 0 and color > 0:
-            for v in vertices:
-                # jeżeli wierzchołek ma już kolor, to sprzeczność
-                if v in colors:
-                    return False
-                colors[v] = color
-            color -= 1
-            vertices = ex.step('sink')
-
-        return len(colors) == len(self.G.vertices())
+        return k >= self.longest_path_order()
 
     def homomorphic_to_transitive(self):
         '''Funkcja która liczy najmniejsze k takie że G jest homomorficzny
         z turniejem tranzytywnym na k wierzchołkach.
         '''
-        k = 1
-        while True:
-            if self.is_homomorphic_to_transitive_k(k):
-                return k
-            k += 1
+        return max(1, self.longest_path_order())
 
-    def homomorphic_to_tournament(self, T):
+    def homomorphic_to_tournament(self, T=None, plan=None):
         '''Funkcja sprawdzająca, czy G jest homomorficzny z dowolnym turniejem
         T. Jeżeli T ma mniej niż 2 cykle, powinniśmy
         używać powyżej zaimplementowanych metod
         :param G: Dowolny graf skierowany, acykliczny
         :param T: Dowolny turniej
+        :param plan: PeelingPlan
+            Plan usuwania źródeł i ujść T. Jeżeli jest podany, to T nie jest
+            używany (i może być None).
         :return: True wtw G jest homomorficzny z T
         '''
-        G, T = rm_sinks_and_sources(self.G, T, True, G_vertices=self._vertices,
-                                    G_degrees=self.degrees)
-        if G.current_vertex_count() == 0:
+        if plan is None:
+            plan = plan_from_graph(T)
+        G_out, G_in = self._peel(plan)
+        if len(G_out) == 0:
             return True
-        if T.current_vertex_count() == 0:
+        if len(plan.core) == 0:
             return False
-        sorted_G = G.topological_sort()
+        if self.engine == 'csp':
+            return self._assign_csp(G_out, G_in, plan.core)
+        return self._assign_backtrack(G_out, plan.core)
+
+    def _assign_backtrack(self, G_out, T_out):
+        '''Przeszukiwanie z nawrotami przyporządkowujące kolejnym (w porządku
+        topologicznym) wierzchołkom G wierzchołki T, z zawężaniem dziedzin
+        następników. Dziedziny oraz sąsiedztwa wychodzące T (`T_out`) są
+        pamiętane jako maski bitowe.
+        '''
+        budget = self.budget
 
         def assign(i, A):
-            if i == len(sorted_G) - 1:
-                # W tym przypadku lista A[v] jest niepusta, więc istnieje
-                # dopasowanie dla v.
+            self.nodes += 1
+            if budget is not None:
+                budget.check(self.nodes)
+            if i == len(G_out) - 1:
+                # W tym przypadku maska A[i] jest niezerowa, więc istnieje
+                # dopasowanie dla i.
                 return True
-            v = sorted_G[i]
-            for w in A[v]:
-                A_prev = {}
-                L = set(T.neighbors_out(w))
-                assignment_possible = True
-                for z in G.neighbors_out(v):
-                    A_prev[z] = A[z]
-                    A[z] = A[z] & L
-                    if len(A[z]) == 0:
-                        for z in A_prev.keys():
-                            A[z] = A_prev[z]
-                        assignment_possible = False
+            domain = A[i]
+            while domain:
+                w = domain & -domain  # najniższy ustawiony bit
+                domain ^= w
+                L = T_out[w.bit_length() - 1]
+                A_prev = []
+                for z in G_out[i]:
+                    A_prev.append((z, A[z]))
+                    A[z] &= L
+                    if not A[z]:
                         break
-                if assignment_possible and assign(i + 1, A):
-                    return True
-                for z in A_prev.keys():
-                    A[z] = A_prev[z]
+                else:
+                    if assign(i + 1, A):
+                        return True
+                for z, prev in A_prev:
+                    A[z] = prev
             return False
 
-        A = {v: set(T.vertices()) for v in G.vertices()}
+        full = (1 << len(T_out)) - 1
+        A = [full] * len(G_out)
         return assign(0, A)
 
+    def _assign_csp(self, G_out, G_in, T_out):
+        '''Rozwiązuje problem spełniania ograniczeń: każdemu wierzchołkowi G
+        trzeba przyporządkować wierzchołek T tak, żeby krawędzie przechodziły
+        na krawędzie. Po każdym przypisaniu utrzymywana jest spójność łukowa
+        ograniczeń w obu kierunkach krawędzi, zmienna jest wybierana według
+        najmniejszej dziedziny (a przy remisie największego stopnia).
+
+        Wartości są próbowane w kolejności rosnących indeksów - porządek
+        według najmniejszego zawężania dziedzin sąsiadów (LCV) zwiększał
+        liczbę odwiedzonych węzłów na turniejach z pliku more_cycles.
+        '''
+        c = len(T_out)
+        full = (1 << c) - 1
+        T_in = [full & ~T_out[w] & ~(1 << w) for w in range(c)]
+        # dziedzina -> suma sąsiedztw wychodzących (wchodzących) jej elementów,
+        # wyznaczana dopiero przy pierwszym użyciu
+        support_out = {1 << w: T_out[w] for w in range(c)}
+        support_in = {1 << w: T_in[w] for w in range(c)}
+        budget = self.budget
+
+        def support(cache, masks, domain):
+            result = cache.get(domain)
+            if result is None:
+                result = 0
+                rest = domain
+                while rest:
+                    w = rest & -rest
+                    rest ^= w
+                    result |= masks[w.bit_length() - 1]
+                cache[domain] = result
+            return result
+
+        n = len(G_out)
+        D = [full] * n
+        trail = []
+        degree = [len(G_out[v]) + len(G_in[v]) for v in range(n)]
+        popcount = _POPCOUNT
+
+        def restrict(neighbors, allowed, queue):
+            if allowed == full:
+                return True
+            for y in neighbors:
+                restricted = D[y] & allowed
+                if restricted != D[y]:
+                    if not restricted:
+                        return False
+                    trail.append((y, D[y]))
+                    D[y] = restricted
+                    queue.append(y)
+            return True
+
+        def propagate(queue):
+            while queue:
+                x = queue.pop()
+                if not restrict(G_out[x], support(support_out, T_out, D[x]),
+                                queue):
+                    return False
+                if not restrict(G_in[x], support(support_in, T_in, D[x]),
+                                queue):
+                    return False
+            return True
+
+        def undo(mark):
+            while len(trail) > mark:
+                y, domain = trail.pop()
+                D[y] = domain
+
+        def search():
+            self.nodes += 1
+            if budget is not None:
+                budget.check(self.nodes)
+            x = None
+            best_size, best_degree = c + 1, -1
+            for v in range(n):
+                size = popcount[D[v]]
+                if size > 1 and (size < best_size or size == best_size and
+                                 degree[v] > best_degree):
+                    x, best_size, best_degree = v, size, degree[v]
+            if x is None:
+                # wszystkie dziedziny są jednoelementowe i spójne łukowo
+                return True
+
+            values = [w for w in range(c) if (D[x] >> w) & 1]
+            for w in values:
+                mark = len(trail)
+                trail.append((x, D[x]))
+                D[x] = 1 << w
+                if propagate([x]) and search():
+                    return True
+                undo(mark)
+            return False
+
+        # Zredukowany turniej nie ma źródeł ani ujść, więc pełne dziedziny są
+        # spójne łukowo i nie trzeba ich zawężać przed przeszukiwaniem.
+        return search()
+
+
+_worker_helper = None  # obiekt Homomorphism w procesie roboczym
+_worker_cancel = None  # Event sygnalizujący znalezienie kontrprzykładu
+_worker_T = (None, None)  # (poziom, KnownHomomorphic) w procesie roboczym
+
+
+def _init_worker(homomorphism_helper, cancel):
+    '''Inicjalizuje proces roboczy. Graf wraz z policzonymi stopniami jest
+    przesyłany do każdego procesu tylko raz.
+    '''
+    global _worker_helper, _worker_cancel, _worker_T
+    _worker_helper = homomorphism_helper
+    _worker_cancel = cancel
+    _worker_T = (None, None)
+
+
+def _check_shard(args):
+    '''Sprawdza fragment turniejów w procesie roboczym. Indeks T jest
+    przesyłany jako zserializowany obiekt i deserializowany tylko raz na
+    poziom.
+    '''
+    global _worker_T
+    method, i, cycles, T_blob, upper_bound, start, stop, collect = args
+    if _worker_T[0] != i:
+        _worker_T = (i, pickle.loads(T_blob))
+    stats = CompressibilityStats() if collect else None
+    return _check_level(_worker_helper, method, i, cycles, _worker_T[1],
+                        upper_bound, start, stop, _worker_cancel,
+                        stats) + (stats,)
+
 
-def compressibility_number(G, upper_bound=10):
+def _check_level(homomorphism_helper, method, i, cycles, T, upper_bound,
+                 start=0, stop=None, cancel=None, stats=None):
+    '''Sprawdza homomorfizm G z turniejami o `i` wierzchołkach z klasy
+    `cycles` o indeksach z przedziału [start, stop).
+
+    :param method: string
+        Nazwa metody klasy Homomorphism, za pomocą której sprawdzany jest
+        homomorfizm.
+    :param T: KnownHomomorphic
+        Turnieje, z którymi G jest homomorficzny. Turnieje zawierające
+        którykolwiek z nich są pomijane.
+    :param cancel: Event
+        Jeżeli nie jest None, to sprawdzanie jest przerywane, gdy zdarzenie
+        zostanie ustawione, a po znalezieniu kontrprzykładu dla i > 5
+        zdarzenie jest ustawiane.
+    :param stats: CompressibilityStats
+        Jeżeli nie jest None, to są do niego dodawane statystyki poziomu.
+    :return: tuple
+        Para (czy znaleziono turniej, z którym G nie jest homomorficzny,
+        lista par (numer turnieju, zbiór krawędzi) turniejów, z którymi G
+        jest homomorficzny). Dla turniejów pominiętych, bo zawierają turniej
+        z T, zamiast zbioru krawędzi jest None.
+    '''
+    is_homomorphic_method = getattr(homomorphism_helper, method)
+    budget = homomorphism_helper.budget
+    found_not_homomorphic = False
+    T_next = []
+    offset = node_offset(i, cycles) + start
+    plans = tournament_plans(i, cycles, start, stop)
+    level = None
+    if stats is not None:
+        # statystyki są zbierane tylko na żądanie, więc przy stats == None
+        # pętla wykonuje jedynie dodatkowe porównania z None
+        level = stats.level(i)
+        plans = stats.timed(i, plans)
+        clock = time.perf_counter
+        nodes = homomorphism_helper.nodes
+    for k, (H_edges, plan) in enumerate(plans):
+        if cancel is not None and k % 64 == 0 and cancel.is_set():
+            break
+        if budget is not None:
+            budget.check()
+        if level is not None:
+            level.tournaments += 1
+            start_time = clock()
+        # Sprawdzamy, czy H zawiera którykolwiek z grafów w T
+        skip = T.contains_known(i, offset + k, H_edges)
+        if level is not None:
+            level.add_time('filter', clock() - start_time)
+        if skip:
+            if level is not None:
+                level.skipped += 1
+            if i < upper_bound:
+                T_next.append((offset + k, None))
+            continue
+        if level is not None:
+            level.add_call(method)
+            if method == 'homomorphic_to_tournament':
+                # wynik jest zapamiętywany, więc homomorphic_to_tournament
+                # nie usuwa wierzchołków ponownie
+                start_time = clock()
+                homomorphism_helper._peel(plan)
+                level.add_time('peel', clock() - start_time)
+            start_time = clock()
+        homomorphic = is_homomorphic_method(plan=plan)
+        if level is not None:
+            level.add_time(method, clock() - start_time)
+        if homomorphic:
+            if i < upper_bound:
+                T_next.append((offset + k, H_edges))
+        else:
+            found_not_homomorphic = True
+            if i > 5:
+                if cancel is not None:
+                    cancel.set()
+                break
+    if level is not None:
+        level.nodes += homomorphism_helper.nodes - nodes
+    return found_not_homomorphic, T_next
+
+
+def _check_level_parallel(pool, cancel, workers, method, i, cycles, T,
+                          upper_bound, stats=None):
+    '''Równoległa wersja `_check_level`. Turnieje są dzielone na fragmenty
+    sprawdzane przez procesy z `pool`. Po znalezieniu kontrprzykładu dla
+    i > 5 wszystkie procesy przerywają pracę.
+    '''
+    count = tournament_count(i, cycles)
+    n_shards = min(count, 4 * workers)
+    if n_shards == 0:
+        return False, []
+    cancel.clear()
+    T_blob = pickle.dumps(T)
+    bounds = [count * k // n_shards for k in range(n_shards + 1)]
+    tasks = [(method, i, cycles, T_blob, upper_bound, bounds[k],
+              bounds[k + 1], stats is not None) for k in range(n_shards)]
+    found_not_homomorphic = False
+    T_next = []
+    for found, T_part, shard_stats in pool.imap_unordered(_check_shard,
+                                                          tasks):
+        found_not_homomorphic = found_not_homomorphic or found
+        T_next += T_part
+        if shard_stats is not None:
+            stats.merge(shard_stats)
+    return found_not_homomorphic, T_next
+
+
+def compressibility_number(G, upper_bound=10, workers=None, cache=None,
+                           time_budget=None, node_budget=None, stats=None):
     '''Fukcja implementująca główny algrytm.
     :param G:
         Graf skierowany
     :param upper_bound:
         Górna granica, powyżej której kompresyjność nie jest sprawdzana.
+    :param workers:
+        Liczba procesów, między które dzielone są turnieje z każdego poziomu.
+        Jeżeli None lub 1, to obliczenia są wykonywane w bieżącym procesie.
+        Wynik nie zależy od liczby procesów.
+    :param cache: CompressibilityCache
+        Jeżeli nie jest None, to przed rozpoczęciem obliczeń sprawdzane jest,
+        czy wynik dla grafu izomorficznego z G nie został już zapamiętany
+        (wynik -1 dla mniejszego `upper_bound` pozwala pominąć poziomy, dla
+        których wiadomo, że istnieje kontrprzykład). Obliczony wynik jest
+        zapamiętywany.
+    :param time_budget: Float
+        Czas (w sekundach), po którym obliczenia są przerywane.
+    :param node_budget: Int
+        Największa liczba węzłów przeszukiwania (patrz `Homomorphism`), po
+        której obliczenia są przerywane. Przy obliczeniach równoległych
+        limit dotyczy każdego procesu osobno.
+    :param stats: CompressibilityStats
+        Jeżeli nie jest None, to są do niego dodawane statystyki obliczeń
+        dla każdego poziomu (patrz `compressibility_stats.py`).
     :return:
         Kompresyjność dla G. Zwraca -1, jeżeli kompresyjność jest większa
-        od `upper_bound`.
+        od `upper_bound`. Jeżeli obliczenia zostały przerwane po
+        przekroczeniu budżetu, to zwracany jest CompressibilityInterval.
     '''
+    budget = None
+    if time_budget is not None or node_budget is not None:
+        budget = Budget(time_budget, node_budget)
+    lower_bound = 1
+    if cache is not None:
+        key = cache.key(G)
+        result, lower_bound = cache.lookup(key, upper_bound)
+        if result is not None:
+            return result
+
     homomorphism_helper = Homomorphism(G)
+    homomorphism_helper.budget = budget
 
-    T = []
     i = homomorphism_helper.homomorphic_to_transitive()
-    T.append(transitive_tournament(i))
+    # każdy turniej o 2^(i-1) wierzchołkach zawiera turniej tranzytywny T_i
+    proven_upper_bound = 2 ** (i - 1)
+    # turnieje, z którymi G jest homomorficzny
+    T = KnownHomomorphic(i)
+    # dla mniejszych i istnieje turniej, z którym G nie jest homomorficzny
+    i = max(i, lower_bound)
 
-    def check_homomorphism(is_homomorphic_method, graphs_generator):
+    pool = None
+    if workers is not None and workers > 1 and i <= upper_bound:
+        cancel = mp.Event()
+        pool = mp.Pool(workers, initializer=_init_worker,
+                       initargs=(homomorphism_helper, cancel))
+
+    def check_homomorphism(method, cycles):
         nonlocal i
-        nonlocal T
         nonlocal upper_bound
         while i <= upper_bound:
-            found_not_homomorphic = False
-            T_next = []
-            for H in graphs_generator(i):
-                # Sprawdzamy, czy H zawiera którykolwiek z grafów w T
-                if any(map(lambda x:
-                           all(H.has_edge(e) for e in x.edge_iterator()), T)):
-                    continue
-                if is_homomorphic_method(H):
-                    if i < upper_bound:
-                        T_next.append(H)
-                else:
-                    found_not_homomorphic = True
-                    if i > 5:
-                        break
+            if stats is not None:
+                start_time = time.perf_counter()
+            if pool is None:
+                found_not_homomorphic, T_next = _check_level(
+                    homomorphism_helper, method, i, cycles, T, upper_bound,
+                    stats=stats)
+            else:
+                found_not_homomorphic, T_next = _check_level_parallel(
+                    pool, cancel, workers, method, i, cycles, T, upper_bound,
+                    stats)
+            if stats is not None:
+                stats.level(i).add_wall_time(
+                    method, time.perf_counter() - start_time)
             if found_not_homomorphic:
+                for node, H_edges in T_next:
+                    T.add(i, node, H_edges)
                 i += 1
-                T = T + T_next
             else:
                 break
 
-    check_homomorphism(homomorphism_helper.is_homomorphic_one_cycle,
-                       lambda x: tournament_iterator(x, 'one_cycle'))
-    check_homomorphism(homomorphism_helper.homomorphic_to_tournament,
-                       lambda x: tournament_iterator(x, 'more_cycles'))
-    return i if i <= upper_bound else -1
+    finished = False
+    try:
+        check_homomorphism('is_homomorphic_one_cycle', 'one_cycle')
+        check_homomorphism('homomorphic_to_tournament', 'more_cycles')
+        finished = True
+    except BudgetExceeded:
+        # dla mniejszych i znaleziono turniej, z którym G nie jest
+        # homomorficzny
+        if cache is not None and i > 1:
+            cache.put(key, -1, i - 1)
+        return CompressibilityInterval(i, min(upper_bound,
+                                              proven_upper_bound))
+    finally:
+        if pool is not None:
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+    result = i if i <= upper_bound else -1
+    if cache is not None:
+        cache.put(key, result, upper_bound)
+    return result
+
+
+def compressibility_numbers(graphs, upper_bound=10):
+    '''Liczy kompresyjność dla wielu grafów jednocześnie. Turnieje z każdego
+    poziomu są czytane tylko raz i każdy z nich jest sprawdzany dla wszystkich
+    grafów, których kompresyjność nie została jeszcze ustalona na danym
+    poziomie. Wynik jest taki sam, jak przy wywołaniu `compressibility_number`
+    dla każdego grafu osobno.
+
+    :param graphs: iterable
+        Grafy skierowane.
+    :param upper_bound:
+        Górna granica, powyżej której kompresyjność nie jest sprawdzana.
+    :return: list
+        Lista kompresyjności kolejnych grafów (-1, jeżeli kompresyjność jest
+        większa od `upper_bound`).
+    '''
+    helpers = [Homomorphism(G) for G in graphs]
+    levels = [helper.homomorphic_to_transitive() for helper in helpers]
+    T = [KnownHomomorphic(i) for i in levels]
+
+    for method, cycles in [('is_homomorphic_one_cycle', 'one_cycle'),
+                           ('homomorphic_to_tournament', 'more_cycles')]:
+        # grafy, dla których bieżący etap został zakończony
+        done = [i > upper_bound for i in levels]
+        for i in range(min(levels, default=upper_bound + 1), upper_bound + 1):
+            active = [g for g in range(len(helpers))
+                      if not done[g] and levels[g] == i]
+            if len(active) == 0:
+                continue
+            found_not_homomorphic = {g: False for g in active}
+            T_next = {g: [] for g in active}
+            offset = node_offset(i, cycles)
+            for k, (H_edges, plan) in enumerate(tournament_plans(i, cycles)):
+                still_active = []
+                for g in active:
+                    still_active.append(g)
+                    if T[g].contains_known(i, offset + k, H_edges):
+                        if i < upper_bound:
+                            T_next[g].append((offset + k, None))
+                        continue
+                    if getattr(helpers[g], method)(plan=plan):
+                        if i < upper_bound:
+                            T_next[g].append((offset + k, H_edges))
+                    else:
+                        found_not_homomorphic[g] = True
+                        if i > 5:
+                            still_active.pop()
+                active = still_active
+                if len(active) == 0:
+                    break
+            for g, found in found_not_homomorphic.items():
+                if found:
+                    for node, H_edges in T_next[g]:
+                        T[g].add(i, node, H_edges)
+                    levels[g] += 1
+                    done[g] = levels[g] > upper_bound
+                else:
+                    done[g] = True
+    return [i if i <= upper_bound else -1 for i in levels]
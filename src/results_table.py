@@ -0,0 +1,94 @@
+from src.experiments_helpers import read_results
+from src.homomorphism import CompressibilityInterval
+
+import numpy as np
+import os
+
+'''
+Plik zawierający kolumnową postać wyników eksperymentów, z której
+korzystają wykresy w `experiments.py`.
+
+Wyniki ze wszystkich plików tekstowych zapisanych przez
+`check_compressibility_many` (lub `run_experiments`) są zbierane w jednej
+tablicy numpy o typie RESULTS_DTYPE (jeden wiersz na graf) i zapisywane w
+pliku .npy. Plik jest czytany przez `np.load(..., mmap_mode='r')`, więc
+kolumny tablicy są widokami na odwzorowany w pamięci plik i mogą być
+przetwarzane wektorowo bez parsowania tekstu i tworzenia grafów.
+
+Kolumny:
+* p, n_cycles - parametry komórki eksperymentu, z której pochodzi graf,
+* compressibility - kompresyjność (-1, jeżeli jest większa od górnego
+  ograniczenia, 0, jeżeli obliczenia zostały przerwane),
+* lower, upper - przedział, w którym leży kompresyjność (dla obliczeń
+  zakończonych oba końce są równe compressibility),
+* longest_path - długość najdłuższej ścieżki skierowanej,
+* vertices, edges, density, triangles - cechy grafu (patrz
+  `graph_features`), gęstość to liczba krawędzi / liczba wierzchołków.
+'''
+
+
+RESULTS_DTYPE = np.dtype([('p', 'f8'), ('n_cycles', 'i4'),
+                          ('compressibility', 'i4'), ('lower', 'i4'),
+                          ('upper', 'i4'), ('longest_path', 'i4'),
+                          ('vertices', 'i4'), ('edges', 'i4'),
+                          ('density', 'f8'), ('triangles', 'i4')])
+
+
+def results_rows(path, p, n_cycles):
+    '''Generator wierszy tablicy (krotek zgodnych z RESULTS_DTYPE) dla
+    wyników zapisanych w pliku `path` komórki (`p`, `n_cycles`).
+    '''
+    for _, compressibility, longest_path, features in read_results(path):
+        vertices, edges, triangles = features
+        if isinstance(compressibility, CompressibilityInterval):
+            lower, upper = compressibility
+            compressibility = 0
+        else:
+            lower = upper = compressibility
+        yield (p, n_cycles, compressibility, lower, upper, longest_path,
+               vertices, edges, edges / vertices if vertices else 0,
+               triangles)
+
+
+def build_results_table(files, table_path):
+    '''Zapisuje wyniki z plików `files` (słownik {ścieżka do pliku wyników:
+    (p, n_cycles)}) jako tablicę w pliku `table_path`. Brakujące pliki
+    wyników są pomijane, tak jak niedokończone ostatnie linijki (pliki nie
+    są modyfikowane, więc tablicę można tworzyć w trakcie obliczeń).
+    '''
+    rows = []
+    for path, (p, n_cycles) in files.items():
+        rows.extend(results_rows(path, p, n_cycles))
+    table = np.array(rows, dtype=RESULTS_DTYPE)
+    with open(table_path + ".tmp", 'wb') as file:
+        np.save(file, table)
+    os.replace(table_path + ".tmp", table_path)
+
+
+def load_results_table(files, table_path):
+    '''Zwraca tablicę wyników z pliku `table_path` odwzorowaną w pamięci.
+    Jeżeli plik nie istnieje lub któryś z plików wyników `files` (jak w
+    `build_results_table`) został zmieniony później, to tablica jest
+    najpierw tworzona ponownie.
+    '''
+    if not os.path.exists(table_path) or any(
+            os.path.exists(path) and
+            os.path.getmtime(path) > os.path.getmtime(table_path)
+            for path in files):
+        build_results_table(files, table_path)
+    return np.load(table_path, mmap_mode='r')
+
+
+def compressibility_path_diff(table, cap=4):
+    '''Zwraca różnicę pomiędzy kompresyjnością, a długością najdłuższej
+    ścieżki dla wierszy `table` z zakończonymi obliczeniami, ograniczoną z
+    góry przez `cap` (kompresyjność -1 daje `cap`), oraz maskę tych wierszy.
+
+    :return: tuple
+        Para (tablica różnic, maska wierszy tablicy `table`).
+    '''
+    compressibility = table['compressibility']
+    finished = compressibility != 0
+    compressibility = compressibility[finished]
+    diff = np.minimum(compressibility - table['longest_path'][finished], cap)
+    return np.where(compressibility == -1, cap, diff), finished
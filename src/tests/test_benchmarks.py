@@ -0,0 +1,68 @@
+import sage.all
+import pytest
+
+import os
+
+from src.benchmarks import corpus, corpus_digest, run_benchmarks, \
+    append_history, read_history, compare, find_record, main, CORPORA
+
+
+@pytest.mark.parametrize('name', CORPORA)
+def test_corpus_seeded(name):
+    graphs = corpus(name, 3)
+    assert len(graphs) > 0
+    assert all(G.is_directed_acyclic() for G in graphs)
+    assert corpus_digest(corpus(name, 3)) == corpus_digest(graphs)
+
+
+def test_corpus_unknown():
+    with pytest.raises(ValueError):
+        corpus('nieznany')
+
+
+def test_history(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    assert read_history(path) == []
+    record = run_benchmarks(repeat=2, only='homomorphic_to_transitive')
+    assert set(record['results']) == \
+        {'homomorphic_to_transitive/%s' % name for name in CORPORA}
+    for result in record['results'].values():
+        assert 0 <= result['min'] <= result['median']
+    append_history(record, path)
+    append_history(dict(record, commit='abc'), path)
+    with open(path, 'a') as file:
+        file.write('{"commit": "przerw')
+    history = read_history(path)
+    assert history == [record, dict(record, commit='abc')]
+    assert find_record(history) == history[1]
+    assert find_record(history, 'ab') == history[1]
+    assert find_record(history, 'xyz') is None
+
+
+def record(corpora, results):
+    return {'corpora': corpora,
+            'results': {name: {'min': t, 'median': t, 'count': 1}
+                        for name, t in results.items()}}
+
+
+def test_compare():
+    old = record({'a': '1', 'b': '2'},
+                 {'f/a': 1.0, 'f/b': 1.0, 'g[7]': 2.0, 'h/a': 1.0})
+    new = record({'a': '1', 'b': '3'},
+                 {'f/a': 1.5, 'f/b': 0.5, 'g[7]': 1.0})
+    assert compare(old, new) == [('f/a', 1.0, 1.5, 1.5),
+                                 ('g[7]', 2.0, 1.0, 0.5)]
+
+
+def test_main_regression(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    args = ['--repeat', '1', '--only', 'homomorphic_to_transitive/tests',
+            '--history', path]
+    assert main(args + ['--compare']) == 0
+    history = read_history(path)
+    assert len(history) == 1
+    history[0]['results']['homomorphic_to_transitive/tests']['min'] = 1e-9
+    os.remove(path)
+    append_history(history[0], path)
+    assert main(args + ['--compare', '--no-save']) == 1
+    assert len(read_history(path)) == 1
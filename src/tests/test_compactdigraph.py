@@ -0,0 +1,84 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+from sage.misc.randstate import set_random_seed
+import pytest
+import pickle
+import os
+import subprocess
+import sys
+
+from src.CompactDiGraph import CompactDiGraph, dig6_edges
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_from_dig6(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedGNM(12, 30)
+    H = CompactDiGraph.from_dig6(G.dig6_string())
+    assert H.order() == 12
+    assert sorted(H.edge_iterator()) == sorted(G.edge_iterator(labels=False))
+    assert H.to_digraph() == G
+
+
+def test_dig6_edges_loops():
+    n, edges = dig6_edges("AO")
+    assert (n, edges) == (2, [(0, 1)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_neighbors_and_degrees(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedGNM(10, 25)
+    H = CompactDiGraph.from_digraph(G)
+    for v in G.vertices():
+        assert sorted(H.neighbors_out(v)) == sorted(G.neighbors_out(v))
+        assert sorted(H.neighbors_in(v)) == sorted(G.neighbors_in(v))
+        assert H.out_degree(v) == G.out_degree(v)
+        assert H.in_degree(v) == G.in_degree(v)
+    assert H.sinks() == G.sinks()
+    assert H.sources() == G.sources()
+    assert H.is_connected() == G.is_connected()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_topological_sort(seed):
+    set_random_seed(seed)
+    G = CompactDiGraph.from_digraph(
+        digraphs.RandomDirectedAcyclicGraph(15, 0.3))
+    assert G.is_directed_acyclic()
+    position = {v: j for j, v in enumerate(G.topological_sort())}
+    assert len(position) == 15
+    for u, v in G.edge_iterator():
+        assert position[u] < position[v]
+
+
+def test_cyclic():
+    G = CompactDiGraph(3, [(0, 1), (1, 2), (2, 0)])
+    assert not G.is_directed_acyclic()
+    with pytest.raises(ValueError):
+        G.topological_sort()
+
+
+def test_subgraph():
+    G = CompactDiGraph(4, [(0, 1), (1, 2), (2, 3), (0, 3)])
+    H = G.subgraph([0, 1, 3])
+    assert sorted(H.edge_iterator()) == [(0, 1), (0, 2)]
+    assert H.is_connected()
+
+
+def test_pickle():
+    G = CompactDiGraph(4, [(0, 1), (1, 2), (2, 3)])
+    H = pickle.loads(pickle.dumps(G))
+    assert list(H.edge_iterator()) == list(G.edge_iterator())
+
+
+def test_compressibility_without_sage():
+    code = ("import sys; "
+            "from src.CompactDiGraph import CompactDiGraph; "
+            "from src.homomorphism import compressibility_number; "
+            "print(compressibility_number(CompactDiGraph.from_dig6('DOOOO?')),"
+            " any(m.startswith('sage') for m in sys.modules))")
+    root = os.path.dirname(os.path.abspath(__file__)) + "/../.."
+    result = subprocess.run([sys.executable, "-c", code], cwd=root,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['5', 'False']
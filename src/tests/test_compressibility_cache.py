@@ -0,0 +1,50 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+
+import pytest
+
+from src.homomorphism import compressibility_number
+from src.compressibility_cache import CompressibilityCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with CompressibilityCache(str(tmp_path / "cache.sqlite")) as cache:
+        yield cache
+
+
+def test_isomorphic_graphs_share_key():
+    G = digraphs.Path(4)
+    H = G.relabel([3, 1, 0, 2], inplace=False)
+    assert CompressibilityCache.key(G) == CompressibilityCache.key(H)
+
+
+def test_lookup(cache):
+    cache.put("a", 5, 8)
+    cache.put("b", -1, 8)
+    assert cache.lookup("a", 10) == (5, 5)
+    assert cache.lookup("a", 4) == (-1, 5)
+    assert cache.lookup("b", 7) == (-1, 9)
+    assert cache.lookup("b", 9) == (None, 9)
+    assert cache.lookup("c", 9) == (None, 1)
+
+
+def test_put_keeps_better_result(cache):
+    cache.put("a", -1, 8)
+    cache.put("a", -1, 6)
+    assert cache.get("a") == (-1, 8)
+    cache.put("a", 9, 10)
+    cache.put("a", -1, 12)
+    assert cache.get("a") == (9, 10)
+
+
+def test_compressibility_number_with_cache(cache):
+    G = digraphs.Path(5)
+    G.add_path(list(range(5, 8)))
+    G.add_edges([(0, 5), (4, 7)])
+    assert compressibility_number(G, upper_bound=5, cache=cache) == -1
+    assert cache.get(cache.key(G)) == (-1, 5)
+    assert compressibility_number(G, cache=cache) == 6
+    assert cache.get(cache.key(G)) == (6, 10)
+    H = G.relabel(lambda v: v + 10, inplace=False)
+    assert compressibility_number(H, upper_bound=5, cache=cache) == -1
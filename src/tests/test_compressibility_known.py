@@ -1,10 +1,11 @@
 import sage.all
 from sage.graphs.digraph_generators import digraphs
 from sage.graphs.digraph import DiGraph
+from sage.misc.randstate import set_random_seed
 
 import pytest
 
-from src.homomorphism import compressibility_number
+from src.homomorphism import compressibility_number, compressibility_numbers
 
 
 @pytest.mark.parametrize('n', list(range(2, 9)))
@@ -35,3 +36,37 @@ def test_cycle_bigger(n, m):
 def test_compressibility_big(n):
     G = digraphs.Path(n)
     assert compressibility_number(G) == -1
+
+
+@pytest.mark.parametrize('n', [1, 4, 7])
+def test_cycle_workers(n):
+    G = digraphs.Path(5)
+    G.add_path(list(range(5, n + 5)))
+    G.add_edges([(0, 5), (4, n + 4)])
+    assert compressibility_number(G, workers=2) == max(6, n + 1)
+
+
+def test_compressibility_numbers():
+    graphs = [digraphs.Path(n) for n in [2, 5, 12]]
+    for n in range(1, 8):
+        G = digraphs.Path(5)
+        G.add_path(list(range(5, n + 5)))
+        G.add_edges([(0, 5), (4, n + 4)])
+        graphs.append(G)
+    assert compressibility_numbers(graphs) == \
+        [compressibility_number(G) for G in graphs]
+
+
+def test_one_cycle_without_files(monkeypatch, tmp_path):
+    import src.helpers
+    set_random_seed(0)
+    graphs = [digraphs.Path(n) for n in range(2, 8)] + \
+        [digraphs.RandomDirectedAcyclicGraph(9, 0.3) for _ in range(5)]
+    expected = [compressibility_number(G, upper_bound=7) for G in graphs]
+    store_path = src.helpers.store_path
+    monkeypatch.setattr(src.helpers, 'store_path',
+                        lambda i, cycles, extension='bin':
+                        store_path(i, cycles, extension)
+                        if cycles != 'one_cycle' else str(tmp_path / "none"))
+    assert [compressibility_number(G, upper_bound=7) for G in graphs] == \
+        expected
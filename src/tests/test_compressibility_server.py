@@ -0,0 +1,116 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+import pytest
+import io
+import json
+import threading
+
+import src.compressibility_server
+
+from src.homomorphism import compressibility_number
+from src.helpers import preload_tournaments, unload_tournaments, \
+    tournament_plans, max_tournament_order
+from src.compressibility_server import serve_stream, make_unix_server, \
+    handle_request
+from src.compressibility_client import request_compressibility
+
+
+@pytest.fixture
+def preloaded():
+    preload_tournaments(7)
+    yield
+    unload_tournaments()
+
+
+def test_preloaded_plans_match(preloaded):
+    expected = list(tournament_plans(7, 'more_cycles'))
+    unload_tournaments()
+    assert list(tournament_plans(7, 'more_cycles')) == expected
+    assert list(tournament_plans(7, 'more_cycles', 10, 20)) == \
+        expected[10:20]
+
+
+def test_serve_stream(preloaded):
+    graphs = [digraphs.Path(n).dig6_string() for n in range(2, 7)]
+    requests = [json.dumps({'graph': graph, 'upper_bound': 5, 'id': k})
+                for k, graph in enumerate(graphs)]
+    requests += ["", "nie json", json.dumps({'upper_bound': 3})]
+    output = io.StringIO()
+    count = serve_stream(io.StringIO("\n".join(requests) + "\n"), output)
+    responses = [json.loads(line) for line in output.getvalue().split("\n")
+                 if line]
+    assert count == len(responses) == 7
+    for response, n in zip(responses, range(2, 7)):
+        assert response['compressibility'] == \
+            compressibility_number(digraphs.Path(n), 5)
+    assert all('error' in response for response in responses[5:])
+
+
+def test_unix_socket(preloaded, tmp_path):
+    path = str(tmp_path / "server.sock")
+    server = make_unix_server(path, upper_bound=6)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        graphs = [digraphs.Path(n).dig6_string() for n in [3, 5, 7]]
+        responses = list(request_compressibility(path, graphs))
+        assert [r['id'] for r in responses] == [0, 1, 2]
+        assert [r['compressibility'] for r in responses] == [3, 5, -1]
+        responses = list(request_compressibility(path, graphs[2:], 7))
+        assert responses[0]['compressibility'] == 7
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_large_batch(preloaded, tmp_path):
+    # odpowiedzi nie mieszczą się w buforach gniazda
+    path = str(tmp_path / "server.sock")
+    server = make_unix_server(path, upper_bound=1)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        graph = digraphs.Path(2).dig6_string()
+        responses = list(request_compressibility(path, [graph] * 5000))
+        assert sorted(r['id'] for r in responses) == list(range(5000))
+        assert all(r['compressibility'] == -1 for r in responses)
+        responses = request_compressibility(path, [graph] * 5000)
+        assert next(responses)['id'] == 0
+        responses.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_upper_bound_above_catalogue(preloaded):
+    max_order = max_tournament_order()
+    graph = digraphs.Path(3).dig6_string()
+    requests = [json.dumps({'graph': graph, 'upper_bound': max_order + 1,
+                            'id': 0}),
+                json.dumps({'graph': graph, 'upper_bound': 3, 'id': 1})]
+    output = io.StringIO()
+    assert serve_stream(io.StringIO("\n".join(requests) + "\n"),
+                        output) == 2
+    responses = [json.loads(line) for line in output.getvalue().split("\n")
+                 if line]
+    assert 'error' in responses[0] and 'compressibility' not in responses[0]
+    assert responses[1]['compressibility'] == 3
+
+
+def test_computation_error(monkeypatch):
+    def missing(*args, **kwargs):
+        raise FileNotFoundError("brak turniejów")
+    monkeypatch.setattr(src.compressibility_server, 'compressibility_number',
+                        missing)
+    response = handle_request(json.dumps({'graph': 'A_', 'id': 3}))
+    assert response['id'] == 3 and 'brak turniejów' in response['error']
+
+
+def test_stats_request():
+    graph = digraphs.Path(4).dig6_string()
+    response = handle_request(json.dumps({'graph': graph, 'stats': True}))
+    assert response['compressibility'] == 4
+    assert response['stats'][4]['tournaments'] > 0
+    assert 'stats' not in handle_request(json.dumps({'graph': graph}))
@@ -0,0 +1,57 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+from sage.misc.randstate import set_random_seed
+import pytest
+import json
+
+from src.homomorphism import compressibility_number, Homomorphism
+from src.compressibility_stats import CompressibilityStats, LevelStats
+from src.helpers import tournament_count
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_stats_counts(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedAcyclicGraph(10, 0.4)
+    stats = CompressibilityStats()
+    result = compressibility_number(G, upper_bound=7, stats=stats)
+    assert result == compressibility_number(G, upper_bound=7)
+    first = Homomorphism(G).homomorphic_to_transitive()
+    assert min(stats.levels, default=first) == first
+    for i, level in stats.levels.items():
+        checked = sum(level.calls.values())
+        assert level.tournaments == checked + level.skipped
+        assert level.tournaments <= tournament_count(i, 'one_cycle') + \
+            tournament_count(i, 'more_cycles')
+        assert set(level.calls) <= set(level.wall_time)
+        assert all(t >= 0 for t in level.time.values())
+    assert json.loads(stats.to_json()).keys() == \
+        {str(i) for i in stats.levels}
+
+
+def test_stats_parallel():
+    set_random_seed(1)
+    G = digraphs.RandomDirectedAcyclicGraph(10, 0.5)
+    serial = CompressibilityStats()
+    parallel = CompressibilityStats()
+    compressibility_number(G, upper_bound=6, stats=serial)
+    compressibility_number(G, upper_bound=6, workers=2, stats=parallel)
+    # bez przerywania (i <= 5) procesy sprawdzają te same turnieje
+    for i in [j for j in serial.levels if j <= 5]:
+        assert parallel.levels[i].calls == serial.levels[i].calls
+        assert parallel.levels[i].tournaments == \
+            serial.levels[i].tournaments
+
+
+def test_merge():
+    stats = CompressibilityStats()
+    other = CompressibilityStats()
+    stats.level(3).add_call('is_homomorphic_one_cycle')
+    other.level(3).add_call('is_homomorphic_one_cycle')
+    other.level(3).add_time('read', 1.5)
+    other.level(4).nodes = 7
+    stats.merge(other)
+    assert stats.to_dict()[3]['calls'] == {'is_homomorphic_one_cycle': 2}
+    assert stats.to_dict()[3]['time'] == {'read': 1.5}
+    assert stats.level(4).nodes == 7
+    assert LevelStats().to_dict()['tournaments'] == 0
@@ -96,3 +96,52 @@ def test_neighbors_in():
     result = ex.neighbors_in(1)
     expected = [0]
     assert result == expected
+
+
+def test_topological_sort_after_steps():
+    G = DiGraph([(0, 1), (1, 2), (0, 3), (3, 2), (2, 4)])
+    ex = DiGraphExtended(G, keep_removed=True)
+    ex.step('source')
+    ex.step('sink')
+    assert ex.topological_sort() in [[1, 3, 2], [3, 1, 2]]
+    ex.step('sink')
+    assert sorted(ex.topological_sort()) == [1, 3]
+    assert sorted(ex.vertices()) == [1, 3]
+
+
+def test_isolated_vertex_removed_once():
+    G = DiGraph([[0, 1, 2], [(0, 1)]], format='vertices_and_edges')
+    ex = DiGraphExtended(G, keep_removed=True)
+    assert ex.step('source') == [1]
+    assert ex.sinks() == [1]
+    ex.step('sink')
+    assert sorted(ex.removed) == [0, 1, 2]
+    assert ex.current_vertex_count() == 0
+
+
+def test_long_path_peeling():
+    G = digraphs.Path(20000)
+    ex = DiGraphExtended(G, keep_removed=True)
+    while ex.sources():
+        ex.step('source')
+    assert ex.current_vertex_count() == 0
+    assert len(ex.removed) == 20000
+
+
+def test_undo():
+    G = DiGraph([(0, 1), (1, 2), (0, 3), (3, 2), (2, 4), (5, 4)])
+    ex = DiGraphExtended(G, keep_removed=True)
+    expected = DiGraphExtended(G, keep_removed=True)
+    expected.step('sink')
+    ex.step('sink')
+    ex.step('source')
+    ex.step('sink')
+    ex.undo()
+    ex.undo()
+    assert sorted(ex.sources()) == sorted(expected.sources())
+    assert sorted(ex.sinks()) == sorted(expected.sinks())
+    assert ex.removed == expected.removed
+    assert ex.step('source') == expected.step('source')
+    assert ex.vertices() == expected.vertices()
+    with pytest.raises(RuntimeError):
+        DiGraphExtended(G).undo()
@@ -0,0 +1,40 @@
+import pytest
+import random
+
+from src.EdgeSetIndex import EdgeSetIndex
+
+
+def test_contains_subset_of():
+    index = EdgeSetIndex([0b0110, 0b1001])
+    assert index.contains_subset_of(0b0111)
+    assert index.contains_subset_of(0b1101)
+    assert not index.contains_subset_of(0b0101)
+    assert not index.contains_subset_of(0)
+
+
+def test_add_superset_ignored():
+    index = EdgeSetIndex([0b0110])
+    assert not index.add(0b1110)
+    assert len(index) == 1
+
+
+def test_add_removes_supersets():
+    index = EdgeSetIndex([0b01110, 0b10110, 0b11000])
+    assert index.add(0b00110)
+    assert len(index) == 2
+    assert not index.contains_subset_of(0b10101)
+    assert index.contains_subset_of(0b11000)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_against_brute_force(seed):
+    random.seed(seed)
+    index = EdgeSetIndex()
+    stored = []
+    for _ in range(200):
+        mask = random.getrandbits(12) & random.getrandbits(12)
+        expected = any(s & mask == s for s in stored)
+        assert index.contains_subset_of(mask) == expected
+        if index.add(mask):
+            stored = [s for s in stored if s & mask != mask] + [mask]
+        assert len(index) == len(stored)
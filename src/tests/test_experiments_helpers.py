@@ -0,0 +1,142 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+from sage.misc.randstate import set_random_seed
+import pytest
+
+from sage.graphs.graph_generators import graphs
+import numpy as np
+
+from src.experiments_helpers import check_compressibility_many, \
+    run_experiments, random_orientation, random_orientations, \
+    random_multiple_cycles_connected
+from src.homomorphism import CompressibilityInterval
+from src.compressibility_cache import CompressibilityCache
+
+
+def seeded_graphs(seed, count, fail_at=None):
+    set_random_seed(seed)
+    for k in range(count):
+        if k == fail_at:
+            raise RuntimeError("przerwane obliczenia")
+        G = digraphs.RandomDirectedAcyclicGraph(7, 0.4)
+        yield G, len(G.longest_path().edges())
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_resume(tmp_path, batch_size):
+    expected_path = str(tmp_path / "expected.out")
+    path = str(tmp_path / "results.out")
+    expected = check_compressibility_many(seeded_graphs(0, 6), 6,
+                                          expected_path, batch_size)
+    with pytest.raises(RuntimeError):
+        check_compressibility_many(seeded_graphs(0, 6, fail_at=4), 6, path,
+                                   batch_size)
+    with open(path, 'r') as file:
+        assert len(file.readlines()) == 4
+    assert check_compressibility_many(seeded_graphs(0, 6), 6, path,
+                                      batch_size) == expected
+    with open(path, 'r') as file, open(expected_path, 'r') as other:
+        assert file.read() == other.read()
+
+
+def test_resume_incomplete_line(tmp_path):
+    path = str(tmp_path / "results.out")
+    expected = check_compressibility_many(seeded_graphs(1, 3), 6, path)
+    with open(path, 'r') as file:
+        content = file.read()
+    with open(path, 'w') as file:
+        file.write(content[:-3])
+    assert check_compressibility_many(seeded_graphs(1, 3), 6, path) == \
+        expected
+    with open(path, 'r') as file:
+        assert file.read() == content
+
+
+def test_resume_different_graphs(tmp_path):
+    path = str(tmp_path / "results.out")
+    check_compressibility_many(seeded_graphs(2, 3), 6, path)
+    with pytest.raises(ValueError):
+        check_compressibility_many(seeded_graphs(3, 3), 6, path)
+    check_compressibility_many(seeded_graphs(3, 3), 6, path, resume=False)
+
+
+def test_run_experiments(tmp_path):
+    expected = {}
+    cells = {}
+    for seed in range(3):
+        path = str(tmp_path / ("%d.out" % seed))
+        expected[path] = check_compressibility_many(
+            seeded_graphs(seed, 4), 6, str(tmp_path / ("%d.exp" % seed)))
+        cells[path] = list(seeded_graphs(seed, 4))
+    assert run_experiments(cells, 6, workers=2, max_pending=3) == expected
+    for seed in range(3):
+        with open(str(tmp_path / ("%d.out" % seed)), 'r') as file, \
+                open(str(tmp_path / ("%d.exp" % seed)), 'r') as other:
+            assert file.read() == other.read()
+
+
+def test_run_experiments_resume(tmp_path):
+    path = str(tmp_path / "results.out")
+    expected = check_compressibility_many(seeded_graphs(0, 5), 6)
+    check_compressibility_many(seeded_graphs(0, 2), 6, path)
+    cells = {path: seeded_graphs(0, 5)}
+    assert run_experiments(cells, 6, workers=2) == {path: expected}
+
+
+def test_budget_intervals(tmp_path):
+    path = str(tmp_path / "results.out")
+    result = check_compressibility_many(seeded_graphs(0, 3), 6, path,
+                                        time_budget=0)
+    assert all(isinstance(c, CompressibilityInterval) for c, _ in result)
+    assert check_compressibility_many(seeded_graphs(0, 3), 6, path) == \
+        result
+    with pytest.raises(ValueError):
+        check_compressibility_many(seeded_graphs(0, 3), 6, batch_size=2,
+                                   node_budget=10)
+
+
+@pytest.mark.parametrize('max_path_len', [2, 3, 5])
+def test_random_orientations(max_path_len):
+    np.random.seed(0)
+    for j in range(1, 4):
+        G = random_multiple_cycles_connected(j, 20, 6, 4, 0.5, 3)
+        for DiG, longest_path_len in random_orientations(G, max_path_len,
+                                                         10):
+            assert DiG.is_directed_acyclic()
+            assert DiG.to_undirected() == G
+            assert longest_path_len == len(DiG.longest_path().edges())
+            assert longest_path_len <= max_path_len
+
+
+def test_random_orientations_support():
+    # ścieżka o 3 krawędziach ma 8 skierowań, z czego 2 mają ścieżkę
+    # skierowaną o 3 krawędziach
+    G = graphs.PathGraph(4)
+    for max_path_len, count in [(1, 2), (2, 6), (3, 8)]:
+        np.random.seed(max_path_len)
+        orientations = {tuple(sorted(DiG.edges(labels=False)))
+                        for DiG, _ in random_orientations(G, max_path_len,
+                                                          200)}
+        assert len(orientations) == count
+
+
+def test_random_orientation_seeded():
+    G = graphs.RandomGNM(10, 14)
+    np.random.seed(5)
+    DiG, longest_path_len = random_orientation(G, 9)
+    np.random.seed(5)
+    assert random_orientation(G, 9) == (DiG, longest_path_len)
+    with pytest.raises(ValueError):
+        random_orientation(graphs.CompleteGraph(4), 2)
+
+
+def test_cache_closed_on_error(tmp_path, monkeypatch):
+    closed = []
+    close = CompressibilityCache.close
+    monkeypatch.setattr(CompressibilityCache, 'close',
+                        lambda self: closed.append(close(self)))
+    with pytest.raises(RuntimeError):
+        check_compressibility_many(seeded_graphs(0, 4, fail_at=2), 6,
+                                   str(tmp_path / "results.out"),
+                                   cache=str(tmp_path / "cache.sqlite"))
+    assert len(closed) == 1
@@ -1,5 +1,6 @@
 import sage.all
 from sage.graphs.digraph import DiGraph
+from sage.graphs.digraph_generators import digraphs
 
 import pytest
 from collections import Counter
@@ -157,3 +158,47 @@ def test_transitive():
     expected = DiGraph([(1, 0), (2, 0), (2, 1), (3, 0), (3, 1), (3, 2),
                         (4, 0), (4, 1), (4, 2), (4, 3)])
     assert result == expected
+
+
+def test_edge_set_bitmask_containment():
+    T = tournament_with_one_cycle(5, [True, False])
+    H = T.subgraph([0, 1, 2, 4])
+    mask_T = edge_set_bitmask(T.edge_iterator(labels=False))
+    mask_H = edge_set_bitmask(H.edge_iterator(labels=False))
+    assert mask_T & mask_H == mask_H
+    assert bin(mask_T).count('1') == 10
+    assert edge_set_bitmask([(0, 1)]) != edge_set_bitmask([(1, 0)])
+
+
+@pytest.mark.parametrize("n", list(range(1, 7)))
+def test_tournament_edge_set(n):
+    for T in digraphs.tournaments_nauty(n):
+        assert tournament_edge_set(pack_tournament(T), n) == \
+            edge_set_bitmask(T.edge_iterator(labels=False))
+
+
+def test_replay_plan():
+    G = digraphs.Path(5)
+    G.add_path(list(range(5, 6)))
+    G.add_edges([(0, 5), (4, 5)])
+    T = DiGraph([(1, 0), (2, 0), (2, 1), (2, 4), (3, 0), (3, 1), (3, 2),
+                 (4, 0), (4, 1), (4, 3), (5, 0), (5, 1), (5, 2), (5, 3),
+                 (5, 4)])
+    expected = rm_sinks_and_sources(G, T)
+    assert set(replay_plan(G, plan_from_graph(T)).removed) == \
+        set(expected.removed)
+
+
+def test_one_cycle_without_files(monkeypatch, tmp_path):
+    import src.helpers
+    with_files = list(tournament_plans(6, 'one_cycle'))
+    monkeypatch.setattr(src.helpers, 'store_path',
+                        lambda i, cycles, extension='bin':
+                        str(tmp_path / ("%d.%s" % (i, extension))))
+    assert tournament_count(6, 'one_cycle') == 4
+    plans = list(tournament_plans(6, 'one_cycle'))
+    assert len(plans) == 4
+    assert with_files[0] in plans
+    for (_, plan), T in zip(plans, tournament_iterator(6, 'one_cycle')):
+        assert has_exactly_one_cycle_tournament(T)
+        assert len(plan.core) == 3
@@ -1,5 +1,7 @@
 import sage.all
+from sage.graphs.digraph import DiGraph
 from sage.graphs.digraph_generators import digraphs
+from sage.misc.randstate import set_random_seed
 
 import pytest
 
@@ -123,3 +125,112 @@ def test_homomorphic():
     G = DiGraph([(0, 1), (0, 2), (1, 2), (1, 3), (3, 4), (5, 4)])
     H = DiGraph([(0, 2), (0, 3), (1, 0), (2, 1), (3, 1), (3, 2)])
     assert Homomorphism(G).homomorphic_to_tournament(H)
+
+
+def test_peeling_shared_between_tournaments():
+    G = DiGraph([(0, 1), (1, 2), (0, 2), (2, 3), (4, 3), (5, 4)])
+    helper = Homomorphism(G)
+    T_1 = tournament_with_one_cycle(5, [False, True])
+    T_2 = DiGraph([(0, 1), (1, 2), (2, 3), (3, 0), (0, 2), (1, 3)])
+    T_2.add_edges([(4, v) for v in range(4)] + [(v, 5) for v in range(5)])
+    for T in [T_1, T_2]:
+        assert helper.homomorphic_to_tournament(T) == \
+            Homomorphism(G).homomorphic_to_tournament(T)
+    assert len(helper._peeled) == 1
+
+
+@pytest.mark.parametrize("steps", [
+    ('source', 'sink', 'sink'),
+    ('sink', 'source', 'sink'),
+    ('sink', 'sink', 'source')
+])
+def test_peeling_steps_commute(steps):
+    G = DiGraph([(0, 1), (1, 2), (0, 2), (2, 3), (4, 3), (5, 4), (6, 5)])
+    expected = replay_plan(G, PeelingPlan(('source', 'sink', 'sink'), ()))
+    result = replay_plan(G, PeelingPlan(steps, ()))
+    assert set(result.removed) == set(expected.removed)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_longest_path_order(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedAcyclicGraph(12, 0.3)
+    expected = len(G.longest_path().vertices())
+    assert Homomorphism(G).longest_path_order() == expected
+    assert Homomorphism(G).homomorphic_to_transitive() == expected
+
+
+def test_transitive_cyclic_graph():
+    G = DiGraph([(0, 1), (1, 2), (2, 0)])
+    with pytest.raises(ValueError):
+        Homomorphism(G).is_homomorphic_to_transitive_k(3)
+
+
+def test_homomorphic_to_C_three_long_path():
+    G = DiGraph()
+    G.add_path(range(20000))
+    assert Homomorphism(G).is_homomorphic_to_C_three()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_homomorphic_to_C_three_components(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedGNM(15, 12)
+    expected = all(
+        Homomorphism(H).connected_is_homomorphic_to_C_three()
+        for H in G.connected_components_subgraphs())
+    assert Homomorphism(G).is_homomorphic_to_C_three() == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_engines_agree(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedAcyclicGraph(10, 0.5)
+    csp = Homomorphism(G, engine='csp')
+    backtrack = Homomorphism(G, engine='backtrack')
+    for T in tournament_iterator(6, 'more_cycles'):
+        assert csp.homomorphic_to_tournament(T) == \
+            backtrack.homomorphic_to_tournament(T)
+    assert csp.nodes > 0 and backtrack.nodes > 0
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Homomorphism(DiGraph([(0, 1)]), engine='sat')
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_one_cycle_level(seed):
+    set_random_seed(seed)
+    G = digraphs.RandomDirectedAcyclicGraph(12, 0.3)
+    helper = Homomorphism(G)
+    verdicts = helper.one_cycle_level(7)
+    assert len(verdicts) == 5
+    for steps, result in verdicts.items():
+        expected = replay_plan(G, PeelingPlan(steps, ())).get_current()
+        assert result == helper.is_homomorphic_to_C_three(expected)
+    flags = [False, True, True, True]
+    T = tournament_with_one_cycle(7, flags)
+    assert helper.is_homomorphic_one_cycle(T) == \
+        verdicts[plan_from_graph(T).steps]
+
+
+def test_budget_exceeded():
+    set_random_seed(3)
+    G = digraphs.RandomDirectedAcyclicGraph(11, 0.3)
+    expected = compressibility_number(G, upper_bound=7)
+    result = compressibility_number(G, upper_bound=7, time_budget=0)
+    assert isinstance(result, CompressibilityInterval)
+    assert result.lower <= result.upper <= 7
+    assert result.lower == Homomorphism(G).homomorphic_to_transitive()
+    assert expected == -1 or result.lower <= expected <= result.upper
+    assert compressibility_number(G, upper_bound=7, time_budget=60,
+                                  node_budget=10 ** 9) == expected
+
+
+def test_node_budget():
+    helper = Homomorphism(digraphs.Path(4), engine='backtrack')
+    helper.budget = Budget(node_budget=2)
+    with pytest.raises(BudgetExceeded):
+        for T in tournament_iterator(5, 'more_cycles'):
+            helper.homomorphic_to_tournament(T)
@@ -0,0 +1,97 @@
+import sage.all
+from sage.graphs.digraph import DiGraph
+from sage.misc.randstate import set_random_seed
+import numpy as np
+import os
+import pytest
+
+from src.experiments_helpers import check_compressibility_many, \
+    graph_features, parse_result
+from src.homomorphism import CompressibilityInterval
+from src.results_table import load_results_table, build_results_table, \
+    compressibility_path_diff
+from src.tests.test_experiments_helpers import seeded_graphs
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_graph_features(seed):
+    for G, _ in seeded_graphs(seed, 3):
+        assert graph_features(G) == \
+            (G.order(), G.size(), G.to_undirected().triangles_count())
+
+
+def test_parse_result_old_format():
+    G = DiGraph([(0, 1), (1, 2), (0, 2), (2, 3)])
+    line = "%s 3:5 2" % G.dig6_string()
+    assert parse_result(line) == (G.dig6_string(),
+                                  CompressibilityInterval(3, 5), 2,
+                                  (4, 4, 1))
+    assert parse_result(line + " 4 4 1") == parse_result(line)
+
+
+def test_results_table(tmp_path):
+    files = {}
+    expected = []
+    for seed, (p, j) in enumerate([(1, 1), (0.5, 2)]):
+        path = str(tmp_path / ("%.1f:%d.out" % (p, j)))
+        files[path] = (p, j)
+        results = check_compressibility_many(seeded_graphs(seed, 5), 6,
+                                             path)
+        for (G, _), (compressibility, path_len) in \
+                zip(seeded_graphs(seed, 5), results):
+            expected.append((p, j, compressibility, path_len,
+                             G.order(), G.size(),
+                             G.to_undirected().triangles_count()))
+    files[str(tmp_path / "brak.out")] = (0, 1)
+    table_path = str(tmp_path / "results.npy")
+
+    table = load_results_table(files, table_path)
+    assert isinstance(table, np.memmap)
+    assert [(row['p'], row['n_cycles'], row['compressibility'],
+             row['longest_path'], row['vertices'], row['edges'],
+             row['triangles']) for row in table] == expected
+    assert np.allclose(table['density'], table['edges'] / table['vertices'])
+    assert np.array_equal(table['lower'], table['compressibility'])
+
+    diff, finished = compressibility_path_diff(table)
+    assert finished.all()
+    assert list(diff) == [4 if c == -1 else min(c - l, 4)
+                          for _, _, c, l, _, _, _ in expected]
+
+
+def test_results_table_rebuild(tmp_path):
+    path = str(tmp_path / "1.0:1.out")
+    table_path = str(tmp_path / "results.npy")
+    G = DiGraph([(0, 1), (1, 2), (0, 2)])
+    with open(path, 'w') as file:
+        file.write("%s 3 2\n" % G.dig6_string())
+    assert len(load_results_table({path: (1, 1)}, table_path)) == 1
+    with open(path, 'a') as file:
+        file.write("%s 2:4 2\n" % G.dig6_string())
+    os.utime(path, (os.path.getmtime(table_path) + 1,) * 2)
+    table = load_results_table({path: (1, 1)}, table_path)
+    assert len(table) == 2
+    assert (table[1]['compressibility'], table[1]['lower'],
+            table[1]['upper']) == (0, 2, 4)
+    diff, finished = compressibility_path_diff(table)
+    assert list(finished) == [True, False]
+    assert list(diff) == [1]
+
+
+def test_results_table_incomplete_line(tmp_path):
+    path = str(tmp_path / "1.0:1.out")
+    G = DiGraph([(0, 1), (1, 2), (0, 2)])
+    content = "%s 3 2 3 3 1\n%s 2:" % ((G.dig6_string(),) * 2)
+    with open(path, 'w') as file:
+        file.write(content)
+    table = load_results_table({path: (1, 1)}, str(tmp_path / "r.npy"))
+    assert len(table) == 1
+    # plik może być właśnie zapisywany, więc nie jest zmieniany
+    with open(path, 'r') as file:
+        assert file.read() == content
+
+
+def test_results_table_empty(tmp_path):
+    table_path = str(tmp_path / "results.npy")
+    build_results_table({}, table_path)
+    assert len(load_results_table({}, table_path)) == 0
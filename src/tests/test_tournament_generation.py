@@ -0,0 +1,53 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+import pytest
+import os
+
+from src.helpers import has_exactly_one_cycle_tournament
+from src.tournament_generation import *
+from src.tournament_store import TournamentStore, pack_tournament, \
+    store_path
+
+
+def records(root, n, cycles):
+    with TournamentStore(root + "/%s/%d.bin" % (cycles, n)) as store:
+        return list(store.records())
+
+
+@pytest.mark.parametrize("n", list(range(3, 7)))
+def test_classify_tournament(n):
+    for T in digraphs.tournaments_nauty(n):
+        cycles, _ = classify_tournament(pack_tournament(T), n)
+        if T.is_transitive():
+            assert cycles is None
+        elif has_exactly_one_cycle_tournament(T):
+            assert cycles == 'one_cycle'
+        else:
+            assert cycles == 'more_cycles'
+
+
+@pytest.mark.parametrize("n", list(range(1, 8)))
+def test_generate_level_matches_catalogue(tmp_path, n):
+    root = str(tmp_path)
+    assert generate_level(n, root)
+    assert not generate_level(n, root)
+    for cycles in CLASSES:
+        with TournamentStore(store_path(n, cycles)) as store:
+            assert records(root, n, cycles) == list(store.records())
+
+
+def test_generate_level_resume(tmp_path):
+    root = str(tmp_path)
+    generate_level(8, root + "/full", shards=3, workers=2)
+    # przerwane generowanie: ukończony jest tylko fragment 1
+    os.makedirs(root + "/part/shards/8")
+    generate_shard((gentourng_path(), 8, 1, 3, root + "/part"))
+    counts = []
+    generate_level(8, root + "/part", shards=3, progress=counts.append)
+    assert len(counts) == 2
+    assert not os.path.exists(root + "/part/shards/8")
+    for cycles in CLASSES:
+        assert records(root + "/part", 8, cycles) == \
+            records(root + "/full", 8, cycles)
+    assert sum(len(records(root + "/full", 8, cycles))
+               for cycles in CLASSES) == 6879
@@ -0,0 +1,112 @@
+import sage.all
+from sage.graphs.digraph_generators import digraphs
+import pytest
+
+import os
+import shutil
+
+import src.tournament_lattice
+import src.tournament_store
+from src.tournament_lattice import *
+from src.tournament_store import pack_tournament, unpack_tournament, \
+    store_path
+from src.homomorphism import compressibility_number, compressibility_numbers
+
+
+@pytest.fixture
+def lattice_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(src.tournament_lattice, 'TOURNAMENTS_PATH',
+                        str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("n", list(range(1, 7)))
+def test_tournament_digraph6(n):
+    for T in digraphs.tournaments_nauty(n):
+        bits = pack_tournament(T)
+        assert tournament_digraph6(bits, n) == '&' + T.dig6_string()
+
+
+def test_level_bits():
+    for n in range(1, 7):
+        assert sum(1 for _ in level_bits(n)) == level_size(n)
+    T = digraphs.TransitiveTournament(4)
+    assert next(level_bits(4)) == pack_tournament(T)
+
+
+@pytest.mark.parametrize("n", [4, 5, 6])
+def test_build_lattice(lattice_root, n):
+    assert build_lattice(n) == level_size(n)
+    lattice = load_lattice(n)
+    assert len(lattice) == level_size(n)
+    smaller = [unpack_tournament(bits, n - 1) for bits in level_bits(n - 1)]
+    for k, bits in enumerate(level_bits(n)):
+        H = unpack_tournament(bits, n)
+        expected = set()
+        for v in range(n):
+            S = H.copy()
+            S.delete_vertex(v)
+            expected |= {j for j, T in enumerate(smaller)
+                         if T.is_isomorphic(S)}
+        assert list(lattice.children(k)) == sorted(expected)
+
+
+def test_missing_lattice(lattice_root):
+    assert load_lattice(5) is None
+
+
+@pytest.fixture
+def truncated_catalogue(lattice_root, monkeypatch):
+    '''Katalog turniejów o co najwyżej 6 wierzchołkach (wraz z kratami).
+    '''
+    for cycles in ['one_cycle', 'more_cycles']:
+        os.makedirs(os.path.join(lattice_root, cycles))
+        for n in range(1, 7):
+            for extension in ['bin', 'plan']:
+                shutil.copy(store_path(n, cycles, extension),
+                            os.path.join(lattice_root, cycles,
+                                         "%d.%s" % (n, extension)))
+    monkeypatch.setattr(src.tournament_store, 'TOURNAMENTS_PATH',
+                        lattice_root)
+    for n in range(2, 7):
+        build_lattice(n)
+    return lattice_root
+
+
+def test_missing_level(truncated_catalogue):
+    assert level_size(7) is None
+    assert load_lattice(7) is None
+    assert load_lattice(6) is not None
+
+
+@pytest.mark.parametrize("n", [1, 3, 5])
+def test_last_level(truncated_catalogue, n):
+    # kompresyjność równa 6 - największemu rozmiarowi turniejów w katalogu
+    G = digraphs.Path(5)
+    G.add_path(list(range(5, n + 5)))
+    G.add_edges([(0, 5), (4, n + 4)])
+    assert compressibility_number(G, upper_bound=7) == 6
+    assert compressibility_number(G, upper_bound=7, workers=2) == 6
+    assert compressibility_numbers([G], upper_bound=7) == [6]
+
+
+def test_known_homomorphic(lattice_root):
+    build_lattice(4)
+    one_cycle = node_offset(4, 'one_cycle')
+    # każdy turniej o 4 wierzchołkach zawiera turniej tranzytywny T_3
+    assert KnownHomomorphic(3).contains_known(4, one_cycle, None)
+    known = KnownHomomorphic(4)
+    assert not known.contains_known(4, one_cycle, None)
+    known.add(3, node_offset(3, 'one_cycle'))
+    assert known.contains_known(4, one_cycle, None)
+
+
+def test_compressibility_with_lattice(lattice_root):
+    sage.all.set_random_seed(0)
+    graphs = [digraphs.RandomDirectedAcyclicGraph(9, 0.3) for _ in range(6)]
+    expected = [compressibility_number(G, upper_bound=7) for G in graphs]
+    for n in range(2, 8):
+        build_lattice(n)
+    assert [compressibility_number(G, upper_bound=7) for G in graphs] == \
+        expected
+    assert compressibility_numbers(graphs, upper_bound=7) == expected
@@ -0,0 +1,102 @@
+import sage.all
+from sage.graphs.digraph import DiGraph
+from sage.graphs.digraph_generators import digraphs
+
+import pytest
+
+from src.tournament_store import *
+from src.DiGraphExtended import DiGraphExtended
+
+
+@pytest.mark.parametrize("n", list(range(1, 7)))
+def test_pack_unpack(n):
+    for T in digraphs.tournaments_nauty(n):
+        assert unpack_tournament(pack_tournament(T), n) == T
+
+
+@pytest.mark.parametrize("n", list(range(1, 7)))
+def test_dig6_to_bits(n):
+    for T in digraphs.tournaments_nauty(n):
+        assert dig6_to_bits(T.dig6_string()) == (n, pack_tournament(T))
+
+
+def test_pack_not_tournament():
+    with pytest.raises(ValueError):
+        pack_tournament(DiGraph([(0, 1), (1, 2)]))
+
+
+def test_write_and_read_store(tmp_path):
+    tournaments = list(digraphs.tournaments_nauty(6))
+    path = str(tmp_path / "6.bin")
+    count = write_store(path, 6, map(pack_tournament, tournaments))
+    assert count == len(tournaments)
+    with TournamentStore(path) as store:
+        assert len(store) == len(tournaments)
+        assert store.n == 6
+        assert [unpack_tournament(bits, 6) for bits in store.records()] \
+            == tournaments
+        assert list(store.records(10, 20)) == \
+            [pack_tournament(T) for T in tournaments[10:20]]
+        assert store.record(7) == pack_tournament(tournaments[7])
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "3.bin")
+    write_store(path, 3, [])
+    with TournamentStore(path) as store:
+        assert len(store) == 0
+        assert list(store.records()) == []
+
+
+def test_convert_dig6_tree(tmp_path):
+    tournaments = list(digraphs.tournaments_nauty(5))
+    (tmp_path / "more_cycles").mkdir()
+    (tmp_path / "more_cycles" / "5.dig6").write_text(
+        "".join(T.dig6_string() + "\n" for T in tournaments))
+    created = convert_dig6_tree(str(tmp_path), remove=True)
+    assert created == [str(tmp_path) + "/more_cycles/5.bin"]
+    assert not (tmp_path / "more_cycles" / "5.dig6").exists()
+    with TournamentStore(created[0]) as store:
+        assert [unpack_tournament(bits, 5) for bits in store.records()] \
+            == tournaments
+
+
+@pytest.mark.parametrize("n", list(range(1, 7)))
+def test_peeling_plan_matches_digraph_extended(n):
+    for T in digraphs.tournaments_nauty(n):
+        exT = DiGraphExtended(T, keep_removed=True)
+        steps = []
+        while len(exT.sources()) > 0 or len(exT.sinks()) > 0:
+            steps.append('source' if len(exT.sources()) > 0 else 'sink')
+            exT.step(steps[-1])
+        plan = decode_plan(peeling_plan(pack_tournament(T), n), n)
+        assert plan.steps == tuple(steps)
+        core = sorted(exT.vertices())
+        assert plan.core == tuple(
+            sum(1 << core.index(u) for u in T.neighbors_out(v) if u in core)
+            for v in core)
+
+
+def test_write_plans(tmp_path):
+    tournaments = [pack_tournament(T) for T in digraphs.tournaments_nauty(5)]
+    path = str(tmp_path / "5.plan")
+    write_plans(path, 5, tournaments)
+    with TournamentStore(path, PLAN_MAGIC) as store:
+        assert list(store.records()) == \
+            [peeling_plan(bits, 5) for bits in tournaments]
+    with pytest.raises(ValueError):
+        TournamentStore(path)
+
+
+@pytest.mark.parametrize("n", list(range(1, 8)))
+def test_one_cycle_tournaments(n):
+    constructed = [unpack_tournament(bits, n)
+                   for bits in one_cycle_tournaments(n)]
+    labels = set(T.canonical_label().dig6_string() for T in constructed)
+    assert len(labels) == len(constructed) == max(0, n - 2)
+    expected = set()
+    for T in digraphs.tournaments_nauty(n):
+        plan = decode_plan(peeling_plan(pack_tournament(T), n), n)
+        if len(plan.core) == 3:
+            expected.add(T.canonical_label().dig6_string())
+    assert labels == expected
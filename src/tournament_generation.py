@@ -0,0 +1,201 @@
+from src.tournament_store import TournamentStore, StoreWriter, \
+    peeling_plan, TOURNAMENTS_PATH, MAGIC, PLAN_MAGIC
+
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+
+'''
+Plik zawierający generowanie plików w katalogu 'tournaments'.
+
+Turnieje o n wierzchołkach są generowane programem gentourng (z pakietu
+nauty) w `shards` niezależnych fragmentach (opcja res/mod programu). Każdy
+fragment jest klasyfikowany i zapisywany strumieniowo do osobnych plików w
+katalogu `<root>/shards/<n>`, więc zużycie pamięci nie zależy od liczby
+turniejów, a fragmenty mogą być generowane równolegle. Ukończenie fragmentu
+jest oznaczane plikiem `<res>-<shards>.done` - po przerwaniu generowania
+ukończone fragmenty nie są generowane ponownie. Na koniec fragmenty są
+łączone w kolejności numerów, więc wynik zależy tylko od liczby fragmentów,
+a nie od liczby procesów ani kolejności ich zakończenia.
+'''
+
+
+CLASSES = ['one_cycle', 'more_cycles']
+
+
+def default_shards(n):
+    '''Domyślna liczba fragmentów dla turniejów o `n` wierzchołkach.
+    '''
+    return 1 if n < 9 else 4 ** (n - 8)
+
+
+def gentourng_path():
+    '''Zwraca ścieżkę do programu gentourng dostarczanego razem z Sage.
+    '''
+    from sage.features.nauty import NautyExecutable
+    return NautyExecutable("gentourng").absolute_filename()
+
+
+def gentourng_bits(line):
+    '''Zamienia linijkę wyjścia gentourng (znaki górnego trójkąta macierzy w
+    porządku wierszowym, '0' oznacza krawędź i -> j) na bity orientacji
+    turnieju (patrz `tournament_store.py`).
+    '''
+    line = line.strip()
+    if not line:
+        return 0
+    return int(line[::-1].translate(str.maketrans('01', '10')), 2)
+
+
+def generate_bits(program, n, res=0, mod=1):
+    '''Generator bitów orientacji wszystkich (z dokładnością do izomorfizmu)
+    turniejów o `n` wierzchołkach z fragmentu `res` z `mod`.
+    '''
+    with subprocess.Popen([program, '-q', str(n), '%d/%d' % (res, mod)],
+                          stdout=subprocess.PIPE,
+                          universal_newlines=True) as process:
+        for line in process.stdout:
+            yield gentourng_bits(line)
+    if process.returncode != 0:
+        raise RuntimeError("gentourng zakończył się błędem.")
+
+
+def classify_tournament(bits, n):
+    '''Klasyfikuje turniej tak jak robiła to pierwotna wersja
+    `generate_tournaments.py` (za pomocą `has_exactly_one_cycle_tournament`).
+
+    :return: tuple
+        Para (klasa, plan - patrz `peeling_plan`). Klasa jest równa
+        'one_cycle', 'more_cycles', lub None dla turnieju tranzytywnego.
+    '''
+    plan = peeling_plan(bits, n)
+    count = (plan >> 16) & 0xff
+    if count == n:
+        return None, plan
+    # krawędzie 1 -> 0 (para 0), 0 -> 2 (para 1) i 2 -> 1 (para n - 1)
+    if n - count == 3 and bits & 0b11 == 0b10 and not (bits >> (n - 1)) & 1:
+        return 'one_cycle', plan
+    return 'more_cycles', plan
+
+
+def shard_path(root, n, res, mod, cycles=None, extension='bin'):
+    '''Zwraca ścieżkę do pliku fragmentu `res` z `mod` turniejów o `n`
+    wierzchołkach z klasy `cycles` (lub do znacznika ukończenia fragmentu,
+    jeżeli cycles jest None).
+    '''
+    base = root + "/shards/%d/%d-%d" % (n, res, mod)
+    if cycles is None:
+        return base + ".done"
+    return base + ".%s.%s" % (cycles, extension)
+
+
+def generate_shard(args):
+    '''Generuje, klasyfikuje i zapisuje jeden fragment turniejów.
+
+    :param args: tuple
+        (ścieżka do gentourng, n, res, mod, katalog główny).
+    :return: tuple
+        Para (res, liczba zapisanych turniejów).
+    '''
+    program, n, res, mod, root = args
+    writers = {}
+    try:
+        for cycles in CLASSES:
+            writers[cycles] = (
+                StoreWriter(shard_path(root, n, res, mod, cycles), n),
+                StoreWriter(shard_path(root, n, res, mod, cycles, 'plan'), n,
+                            PLAN_MAGIC))
+        for bits in generate_bits(program, n, res, mod):
+            cycles, plan = classify_tournament(bits, n)
+            if cycles is not None:
+                writers[cycles][0].write(bits)
+                writers[cycles][1].write(plan)
+    except BaseException:
+        for pair in writers.values():
+            for writer in pair:
+                writer.abort()
+        raise
+    count = 0
+    for pair in writers.values():
+        for writer in pair:
+            writer.close()
+        count += pair[0].count
+    open(shard_path(root, n, res, mod), 'w').close()
+    return res, count
+
+
+def merge_shards(root, n, mod):
+    '''Łączy fragmenty (w kolejności numerów) w pliki `<n>.bin` i `<n>.plan`
+    każdej z klas, a następnie usuwa katalog z fragmentami.
+    '''
+    for cycles in CLASSES:
+        directory = root + "/" + cycles
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        for extension, magic in [('bin', MAGIC), ('plan', PLAN_MAGIC)]:
+            path = directory + "/%d.%s" % (n, extension)
+            with StoreWriter(path, n, magic) as writer:
+                for res in range(mod):
+                    with TournamentStore(shard_path(root, n, res, mod, cycles,
+                                                    extension),
+                                         magic) as shard:
+                        for bits in shard.records():
+                            writer.write(bits)
+    shutil.rmtree(root + "/shards/%d" % n)
+
+
+def level_complete(root, n):
+    '''Zwraca True wtw pliki turniejów o `n` wierzchołkach zostały już
+    wygenerowane.
+    '''
+    return all(os.path.exists(root + "/%s/%d.%s" % (cycles, n, extension))
+               for cycles in CLASSES for extension in ['bin', 'plan']) and \
+        not os.path.exists(root + "/shards/%d" % n)
+
+
+def generate_level(n, root=TOURNAMENTS_PATH, shards=None, workers=None,
+                   progress=None):
+    '''Generuje pliki turniejów o `n` wierzchołkach, wznawiając przerwane
+    wcześniej generowanie.
+
+    :param shards: Int
+        Liczba fragmentów. Jeżeli None, używane jest `default_shards(n)`.
+        Przy wznawianiu musi być taka sama jak przy pierwszym uruchomieniu.
+    :param workers: Int
+        Liczba procesów generujących fragmenty.
+    :param progress: callable
+        Funkcja wywoływana z liczbą turniejów zapisanych w każdym
+        ukończonym fragmencie (np. do wyświetlania postępu).
+    :return: bool
+        False, jeżeli pliki już istniały, True w przeciwnym przypadku.
+    '''
+    if level_complete(root, n):
+        return False
+    mod = default_shards(n) if shards is None else shards
+    directory = root + "/shards/%d" % n
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    pending = [res for res in range(mod)
+               if not os.path.exists(shard_path(root, n, res, mod))]
+    program = gentourng_path()
+    tasks = [(program, n, res, mod, root) for res in pending]
+    if workers is None or workers <= 1:
+        results = map(generate_shard, tasks)
+        pool = None
+    else:
+        pool = mp.Pool(workers)
+        results = pool.imap_unordered(generate_shard, tasks)
+    try:
+        for _, count in results:
+            if progress is not None:
+                progress(count)
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
+    merge_shards(root, n, mod)
+    return True
@@ -0,0 +1,288 @@
+from src.helpers import tournament_bits, tournament_count, \
+    edge_set_bitmask, transitive_tournament_edges
+from src.tournament_store import TOURNAMENTS_PATH, HEADER, \
+    tournament_out_masks
+from src.EdgeSetIndex import EdgeSetIndex
+
+from array import array
+from functools import lru_cache
+import mmap
+import os
+import subprocess
+
+'''
+Plik zawierający kratę zawierania turniejów z katalogu (z dokładnością do
+izomorfizmu) między kolejnymi poziomami.
+
+Turnieje o n wierzchołkach są numerowane tak samo jak w katalogu: numer 0
+ma turniej tranzytywny, po nim są turnieje o jednym cyklu (w kolejności
+`tournament_bits(n, 'one_cycle')`), a dalej turnieje o co najmniej dwóch
+cyklach. Dziećmi turnieju H o n wierzchołkach są turnieje o n - 1
+wierzchołkach izomorficzne z H bez jednego wierzchołka. Jeżeli G jest
+homomorficzny z którymś z dzieci H, to jest homomorficzny także z H.
+
+Krata dla poziomu n jest zapisana w pliku `lattice/<n>.bin` w katalogu z
+turniejami: nagłówek jak w `tournament_store.py` (z LATTICE_MAGIC, rozmiarem
+elementu tablic w miejscu długości rekordu i liczbą turniejów o n
+wierzchołkach), tablica liczba turniejów + 1 początków list dzieci i
+tablica numerów dzieci (posortowanych, bez powtórzeń). Plik jest czytany
+przez `mmap`, więc listę dzieci turnieju można odczytać bez wczytywania
+całego pliku.
+
+Postacie kanoniczne turniejów są wyznaczane programem labelg (z pakietu
+nauty dostarczanego razem z Sage).
+'''
+
+
+LATTICE_MAGIC = b'LAT1'
+
+
+def lattice_path(n, root=None):
+    '''Zwraca ścieżkę do pliku kraty dla turniejów o `n` wierzchołkach.
+    '''
+    root = TOURNAMENTS_PATH if root is None else root
+    return root + "/lattice/%d.bin" % n
+
+
+def labelg_path():
+    '''Zwraca ścieżkę do programu labelg dostarczanego razem z Sage.
+    '''
+    from sage.features.nauty import NautyExecutable
+    return NautyExecutable("labelg").absolute_filename()
+
+
+def level_size(n):
+    '''Liczba turniejów o `n` wierzchołkach w katalogu (razem z
+    turniejem tranzytywnym), lub None, jeżeli turniejów o `n`
+    wierzchołkach nie ma w katalogu.
+    '''
+    if n < 3:
+        return 1
+    try:
+        return 1 + tournament_count(n, 'one_cycle') + \
+            tournament_count(n, 'more_cycles')
+    except FileNotFoundError:
+        return None
+
+
+def node_offset(n, cycles):
+    '''Numer pierwszego turnieju o `n` wierzchołkach z klasy `cycles`.
+    '''
+    if cycles == 'one_cycle':
+        return 1
+    return 1 + tournament_count(n, 'one_cycle')
+
+
+def level_bits(n):
+    '''Generator bitów orientacji turniejów o `n` wierzchołkach w
+    kolejności numerów.
+    '''
+    yield (1 << n * (n - 1) // 2) - 1
+    if n >= 3:
+        for cycles in ['one_cycle', 'more_cycles']:
+            yield from tournament_bits(n, cycles)
+
+
+def tournament_digraph6(bits, n, removed=None):
+    '''Zapisuje turniej o `n` wierzchołkach (bez wierzchołka `removed`) w
+    formacie digraph6 czytanym przez programy z pakietu nauty.
+    '''
+    out = tournament_out_masks(bits, n)
+    vertices = [v for v in range(n) if v != removed]
+    matrix = ''.join('1' if (out[u] >> v) & 1 else '0'
+                     for u in vertices for v in vertices)
+    matrix += '0' * (-len(matrix) % 6)
+    return '&' + chr(63 + len(vertices)) + \
+        ''.join(chr(63 + int(matrix[k:k + 6], 2))
+                for k in range(0, len(matrix), 6))
+
+
+def canonical_forms(lines, program):
+    '''Zwraca listę postaci kanonicznych grafów zapisanych w formacie
+    digraph6 w `lines`, wyznaczonych programem labelg `program`.
+    '''
+    if len(lines) == 0:
+        return []
+    result = subprocess.run([program, '-q'], input='\n'.join(lines) + '\n',
+                            stdout=subprocess.PIPE, universal_newlines=True,
+                            check=True)
+    return result.stdout.split()
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_lattice(n, root=None, chunk_size=10000):
+    '''Wyznacza kratę dla turniejów o `n` wierzchołkach (n >= 2) i zapisuje
+    ją do pliku `lattice_path(n, root)`. Wymaga turniejów o n - 1 i n
+    wierzchołkach w katalogu.
+
+    :return: Int
+        Liczba turniejów o `n` wierzchołkach.
+    '''
+    program = labelg_path()
+    previous = {}  # postać kanoniczna -> numer turnieju o n - 1 wierzch.
+    node = 0
+    for chunk in _chunks(level_bits(n - 1), chunk_size):
+        forms = canonical_forms(
+            [tournament_digraph6(bits, n - 1) for bits in chunk], program)
+        for form in forms:
+            previous.setdefault(form, node)
+            node += 1
+
+    offsets = array('I', [0])
+    children = array('I')
+    for chunk in _chunks(level_bits(n), chunk_size):
+        forms = canonical_forms(
+            [tournament_digraph6(bits, n, v) for bits in chunk
+             for v in range(n)], program)
+        for k in range(len(chunk)):
+            try:
+                children.extend(sorted({previous[form] for form
+                                        in forms[k * n:(k + 1) * n]}))
+            except KeyError:
+                raise ValueError("Katalog turniejów o %d wierzchołkach jest "
+                                 "niekompletny." % (n - 1))
+            offsets.append(len(children))
+
+    path = lattice_path(n, root)
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path + ".tmp", 'wb') as file:
+        file.write(HEADER.pack(LATTICE_MAGIC, n, children.itemsize,
+                               len(offsets) - 1))
+        offsets.tofile(file)
+        children.tofile(file)
+    os.replace(path + ".tmp", path)
+    return len(offsets) - 1
+
+
+class TournamentLattice():
+    '''Klasa pozwalająca czytać kratę zapisaną przez `build_lattice`.
+
+    :param path: string
+        Ścieżka do pliku kraty.
+    '''
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        header = self._file.read(HEADER.size)
+        if len(header) != HEADER.size or header[:4] != LATTICE_MAGIC:
+            self._file.close()
+            raise ValueError("Plik %s nie jest plikiem kraty." % path)
+        _, self.n, size, self.count = HEADER.unpack(header)
+        if size != array('I').itemsize:
+            self._file.close()
+            raise ValueError("Plik %s jest uszkodzony." % path)
+        self._mmap = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)[HEADER.size:].cast('I')
+        self._offsets = view[:self.count + 1]
+        self._children = view[self.count + 1:]
+        view.release()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._offsets.release()
+        self._children.release()
+        self._mmap.close()
+        self._file.close()
+
+    def children(self, k):
+        '''Zwraca numery dzieci k-tego turnieju.
+        '''
+        return self._children[self._offsets[k]:self._offsets[k + 1]]
+
+
+@lru_cache(maxsize=None)
+def _open_lattice(path, n, size):
+    if not os.path.exists(path):
+        return None
+    lattice = TournamentLattice(path)
+    if lattice.n != n or len(lattice) != size:
+        lattice.close()
+        return None
+    return lattice
+
+
+def load_lattice(n):
+    '''Zwraca kratę (TournamentLattice) dla turniejów o `n` wierzchołkach,
+    lub None, jeżeli nie ma pliku kraty, turniejów o `n` wierzchołkach nie
+    ma w katalogu albo plik nie jest zgodny z katalogiem turniejów (ma inną
+    liczbę turniejów). Plik jest otwierany tylko raz.
+    '''
+    size = level_size(n)
+    if n < 2 or size is None:
+        return None
+    return _open_lattice(lattice_path(n), n, size)
+
+
+class KnownHomomorphic():
+    '''Zbiór turniejów z katalogu, o których wiadomo, że G jest z nimi
+    homomorficzny. Turniej o i wierzchołkach zawierający turniej o i - 1
+    wierzchołkach z tego zbioru można pominąć. Jeżeli istnieje krata dla
+    poziomu i, to sprawdzenie przegląda tylko (co najwyżej i) dzieci
+    turnieju. W przeciwnym przypadku sprawdzane jest etykietowane zawieranie
+    zbiorów krawędzi (EdgeSetIndex).
+
+    :param transitive: Int
+        Liczba wierzchołków najmniejszego turnieju tranzytywnego, z którym G
+        jest homomorficzny. G jest homomorficzny także z większymi
+        turniejami tranzytywnymi.
+    '''
+
+    def __init__(self, transitive):
+        self.transitive = transitive
+        self._index = EdgeSetIndex(
+            [edge_set_bitmask(transitive_tournament_edges(transitive))])
+        self._levels = {}  # liczba wierzchołków -> zbiór numerów turniejów
+        self._lattices = {}  # liczba wierzchołków -> wynik `load_lattice`
+
+    def __getstate__(self):
+        # kraty (otwarte przez mmap) są otwierane ponownie w innym procesie
+        state = self.__dict__.copy()
+        state['_lattices'] = {}
+        return state
+
+    def _lattice(self, i):
+        if i not in self._lattices:
+            self._lattices[i] = load_lattice(i)
+        return self._lattices[i]
+
+    def contains_known(self, i, node, H_edges):
+        '''Zwraca True wtw turniej H o `i` wierzchołkach (o numerze `node` i
+        zbiorze krawędzi `H_edges`) zawiera turniej z tego zbioru.
+        '''
+        lattice = self._lattice(i)
+        if lattice is None:
+            return self._index.contains_subset_of(H_edges)
+        known = self._levels.get(i - 1, ())
+        for child in lattice.children(node):
+            if child in known or (child == 0 and i - 1 >= self.transitive):
+                return True
+        return False
+
+    def add(self, i, node, H_edges=None):
+        '''Dodaje do zbioru turniej o `i` wierzchołkach i numerze `node`.
+        Zbiór krawędzi H_edges jest potrzebny tylko, jeżeli dla poziomu
+        i + 1 nie ma kraty.
+        '''
+        self._levels.setdefault(i, set()).add(node)
+        if H_edges is not None and self._lattice(i + 1) is None:
+            self._index.add(H_edges)
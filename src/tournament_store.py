@@ -0,0 +1,412 @@
+from src.CompactDiGraph import dig6_edges
+
+from collections import namedtuple
+from functools import lru_cache
+import mmap
+import os
+import struct
+
+'''
+Plik zawierający obsługę binarnego formatu przechowywania turniejów.
+
+Plik `<n>.bin` składa się z nagłówka, po którym następują rekordy o stałej
+długości - po jednym na turniej. Rekord zawiera upakowane bity orientacji
+krawędzi górnego trójkąta macierzy sąsiedztwa: dla kolejnych par (i, j),
+i < j (w porządku wierszowym), bit jest ustawiony wtw krawędź jest skierowana
+od i do j. Dzięki stałej długości rekordów można czytać dowolny przedział
+indeksów bez przeglądania całego pliku, a odczyt przez `mmap` pozwala wielu
+procesom współdzielić te same strony pamięci.
+
+Obok pliku `<n>.bin` może znajdować się plik `<n>.plan` w tym samym formacie
+(z innym nagłówkiem), którego k-ty rekord zawiera plan usuwania źródeł i ujść
+k-tego turnieju (patrz `peeling_plan`).
+'''
+
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+TOURNAMENTS_PATH = PATH + "/../tournaments"
+
+MAGIC = b'TRN1'
+PLAN_MAGIC = b'PLN1'
+HEADER = struct.Struct('<4sHHQ')  # magic, n, długość rekordu, liczba rekordów
+
+
+def store_path(i, cycles, extension='bin'):
+    '''Zwraca ścieżkę do pliku z turniejami o `i` wierzchołkach z klasy
+    `cycles` ('one_cycle' lub 'more_cycles').
+    '''
+    return TOURNAMENTS_PATH + "/" + cycles + "/%d.%s" % (i, extension)
+
+
+def record_size(n):
+    '''Liczba bajtów rekordu dla turnieju o `n` wierzchołkach.
+    '''
+    return (n * (n - 1) // 2 + 7) // 8
+
+
+def pack_tournament(G):
+    '''Zwraca bity orientacji turnieju G jako liczbę całkowitą. Wierzchołki
+    G są numerowane zgodnie z kolejnością `G.vertices()`.
+    '''
+    vertices = G.vertices()
+    n = len(vertices)
+    index = {v: j for j, v in enumerate(vertices)}
+    edges = set((index[u], index[v])
+                for u, v in G.edge_iterator(labels=False))
+    bits = 0
+    p = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if (i, j) in edges:
+                bits |= 1 << p
+            elif (j, i) not in edges:
+                raise ValueError("G musi być turniejem.")
+            p += 1
+    return bits
+
+
+def tournament_edges(bits, n):
+    '''Zwraca listę krawędzi turnieju o `n` wierzchołkach zapisanego jako
+    bity orientacji `bits`.
+    '''
+    edges = []
+    p = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if (bits >> p) & 1:
+                edges.append((i, j))
+            else:
+                edges.append((j, i))
+            p += 1
+    return edges
+
+
+def unpack_tournament(bits, n):
+    '''Odtwarza turniej o `n` wierzchołkach z bitów orientacji `bits`.
+
+    :return: DiGraph
+    '''
+    from sage.graphs.digraph import DiGraph
+    return DiGraph([list(range(n)), tournament_edges(bits, n)],
+                   format='vertices_and_edges')
+
+
+def dig6_to_bits(line):
+    '''Zamienia turniej zapisany w formacie dig6 na parę (n, bity orientacji)
+    bez tworzenia obiektu DiGraph.
+    '''
+    n, edges = dig6_edges(line)
+    bits = 0
+    pairs = 0
+    for u, v in edges:
+        i, j = min(u, v), max(u, v)
+        p = i * n - i * (i + 1) // 2 + j - i - 1  # numer pary (i, j)
+        if u == v or (pairs >> p) & 1:
+            raise ValueError("Graf %s nie jest turniejem." % line.strip())
+        pairs |= 1 << p
+        if u < v:
+            bits |= 1 << p
+    if pairs != (1 << n * (n - 1) // 2) - 1:
+        raise ValueError("Graf %s nie jest turniejem." % line.strip())
+    return n, bits
+
+
+def one_cycle_tournaments(n):
+    '''Generator bitów orientacji wszystkich (z dokładnością do izomorfizmu)
+    turniejów o `n` wierzchołkach zawierających dokładnie jeden cykl
+    skierowany. Każdy taki turniej powstaje z C_3 przez dodanie `a` źródeł i
+    `b` ujść (a + b = n - 3, kolejność dodawania nie ma znaczenia), a turnieje
+    o różnych `a` nie są izomorficzne - jest ich więc dokładnie n - 2.
+    Kolejne turnieje są zgodne z `tournament_with_one_cycle(n, sink)` dla
+    sink = [False] * a + [True] * b, dla a = n - 3, ..., 0.
+    '''
+    if n < 3:
+        return
+    for a in range(n - 3, -1, -1):
+        # cykl 0 -> 2 -> 1 -> 0: bity par (0, 1), (0, 2), (1, 2)
+        bits = 0b10
+        p = 0
+        for i in range(n):
+            for j in range(i + 1, n):
+                # wierzchołek j >= 3 jest ujściem wtw j - 3 >= a
+                if j >= 3 and j - 3 >= a:
+                    bits |= 1 << p
+                p += 1
+        yield bits
+
+
+PeelingPlan = namedtuple('PeelingPlan', ['steps', 'core'])
+PeelingPlan.__doc__ = '''Plan usuwania źródeł i ujść z turnieju.
+
+:param steps: tuple
+    Kolejne kroki ('source' lub 'sink') wykonywane przez
+    `rm_sinks_and_sources`.
+:param core: tuple
+    Turniej, który pozostaje po wykonaniu wszystkich kroków, zapisany jako
+    maski bitowe sąsiedztw wychodzących (patrz `tournament_out_masks`).
+'''
+
+
+def tournament_out_masks(bits, n):
+    '''Zwraca listę masek bitowych sąsiedztw wychodzących wierzchołków
+    turnieju o `n` wierzchołkach zapisanego jako bity orientacji `bits`.
+    '''
+    out = [0] * n
+    p = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if (bits >> p) & 1:
+                out[i] |= 1 << j
+            else:
+                out[j] |= 1 << i
+            p += 1
+    return out
+
+
+def peeling_plan(bits, n):
+    '''Wyznacza plan usuwania źródeł i ujść turnieju o `n` wierzchołkach
+    zapisanego jako bity orientacji `bits`, zgodny z `rm_sinks_and_sources`
+    (źródła mają pierwszeństwo przed ujściami, a turniej ma co najwyżej jedno
+    źródło i jedno ujście).
+
+    :return: Int
+        Plan zapisany jako liczba: bity 0-15 to maska kroków (ustawiony bit
+        oznacza 'sink'), bity 16-23 to liczba kroków, a pozostałe bity to
+        bity orientacji turnieju, który pozostaje po usunięciu wierzchołków
+        (z zachowaniem kolejności wierzchołków).
+    '''
+    if n > 16:
+        raise ValueError("Plany są wyznaczane dla turniejów o co najwyżej 16 "
+                         "wierzchołkach.")
+    out = tournament_out_masks(bits, n)
+    alive = (1 << n) - 1
+    steps = 0
+    count = 0
+    while alive:
+        step = None
+        for v in range(n):
+            if not (alive >> v) & 1:
+                continue
+            if (alive & ~out[v]) == 1 << v:  # v jest źródłem
+                step = (v, 0)
+                break
+            if step is None and out[v] & alive == 0:  # v jest ujściem
+                step = (v, 1)
+        if step is None:
+            break
+        alive ^= 1 << step[0]
+        steps |= step[1] << count
+        count += 1
+
+    core = [v for v in range(n) if (alive >> v) & 1]
+    core_bits = 0
+    p = 0
+    for a in range(len(core)):
+        for b in range(a + 1, len(core)):
+            if (out[core[a]] >> core[b]) & 1:
+                core_bits |= 1 << p
+            p += 1
+    return steps | count << 16 | core_bits << 24
+
+
+@lru_cache(maxsize=None)
+def _plan_steps(steps, count):
+    return tuple('sink' if (steps >> k) & 1 else 'source'
+                 for k in range(count))
+
+
+def decode_plan(plan, n):
+    '''Zamienia plan zapisany jako liczba (wynik `peeling_plan` dla turnieju
+    o `n` wierzchołkach) na obiekt PeelingPlan.
+    '''
+    count = (plan >> 16) & 0xff
+    core = tournament_out_masks(plan >> 24, n - count)
+    return PeelingPlan(_plan_steps(plan & 0xffff, count), tuple(core))
+
+
+def plan_record_size(n):
+    '''Liczba bajtów rekordu planu dla turnieju o `n` wierzchołkach.
+    '''
+    return 3 + record_size(n)
+
+
+class StoreWriter():
+    '''Klasa pozwalająca zapisywać turnieje (lub plany) do pliku binarnego
+    po jednym, bez trzymania ich w pamięci. Dane są zapisywane do pliku
+    tymczasowego, który dopiero w `close` zastępuje plik `path` - przerwany
+    zapis nie zostawia niekompletnego pliku.
+
+    :param path: string
+        Ścieżka do tworzonego pliku.
+    :param n: Int
+        Liczba wierzchołków turniejów.
+    :param magic: bytes
+        Nagłówek pliku (MAGIC lub PLAN_MAGIC).
+    '''
+
+    def __init__(self, path, n, magic=MAGIC):
+        self.path = path
+        self.n = n
+        self.magic = magic
+        self.count = 0
+        self._size = plan_record_size(n) if magic == PLAN_MAGIC \
+            else record_size(n)
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(HEADER.pack(magic, n, self._size, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, bits):
+        self._file.write(bits.to_bytes(self._size, 'little'))
+        self.count += 1
+
+    def close(self):
+        '''Uzupełnia nagłówek i zastępuje plik `path` zapisanym plikiem.
+        '''
+        self._file.seek(0)
+        self._file.write(HEADER.pack(self.magic, self.n, self._size,
+                                     self.count))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        '''Usuwa plik tymczasowy bez zapisywania wyniku.
+        '''
+        self._file.close()
+        os.remove(self._tmp_path)
+
+
+def write_store(path, n, records, magic=MAGIC):
+    '''Zapisuje turnieje o `n` wierzchołkach do pliku `path`.
+
+    :param records: iterable
+        Bity orientacji kolejnych turniejów (np. wynik `pack_tournament`),
+        lub plany (np. wynik `peeling_plan`), jeżeli magic == PLAN_MAGIC.
+    :return: Int
+        Liczba zapisanych turniejów.
+    '''
+    with StoreWriter(path, n, magic) as writer:
+        for bits in records:
+            writer.write(bits)
+    return writer.count
+
+
+def write_plans(path, n, records):
+    '''Zapisuje do pliku `path` plany usuwania źródeł i ujść turniejów o `n`
+    wierzchołkach, których bity orientacji są kolejnymi elementami `records`.
+    '''
+    return write_store(path, n, (peeling_plan(bits, n) for bits in records),
+                       PLAN_MAGIC)
+
+
+class TournamentStore():
+    '''Klasa pozwalająca czytać turnieje zapisane w pliku binarnym przez
+    `mmap`.
+
+    :param path: string
+        Ścieżka do pliku zapisanego przez `write_store`.
+    :param magic: bytes
+        Oczekiwany nagłówek pliku (MAGIC lub PLAN_MAGIC).
+    '''
+
+    def __init__(self, path, magic=MAGIC):
+        self._file = open(path, 'rb')
+        header = self._file.read(HEADER.size)
+        if len(header) != HEADER.size:
+            self._file.close()
+            raise ValueError("Plik %s jest uszkodzony." % path)
+        _, self.n, self.record_size, self.count = HEADER.unpack(header)
+        if header[:len(magic)] != magic:
+            self._file.close()
+            raise ValueError("Plik %s nie jest plikiem z turniejami." % path)
+        if self.count > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        else:  # nie można zmapować pustego przedziału
+            self._mmap = b''
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def record(self, k):
+        '''Zwraca bity orientacji k-tego turnieju.
+        '''
+        if not 0 <= k < self.count:
+            raise IndexError("Indeks poza zakresem.")
+        offset = HEADER.size + k * self.record_size
+        return int.from_bytes(self._mmap[offset:offset + self.record_size],
+                              'little')
+
+    def records(self, start=0, stop=None):
+        '''Generator bitów orientacji turniejów o indeksach z przedziału
+        [start, stop).
+        '''
+        if stop is None or stop > self.count:
+            stop = self.count
+        size = self.record_size
+        offset = HEADER.size + start * size
+        for _ in range(start, stop):
+            yield int.from_bytes(self._mmap[offset:offset + size], 'little')
+            offset += size
+
+
+def _dig6_records(lines, n):
+    '''Generator bitów orientacji turniejów o `n` wierzchołkach zapisanych
+    w kolejnych linijkach w formacie dig6.
+    '''
+    for line in lines:
+        if not line.strip():
+            continue
+        m, bits = dig6_to_bits(line)
+        if m != n:
+            raise ValueError("Turniej %s nie ma %d wierzchołków."
+                             % (line.strip(), n))
+        yield bits
+
+
+def convert_dig6_tree(root=TOURNAMENTS_PATH, remove=False):
+    '''Konwertuje wszystkie pliki `<klasa>/<n>.dig6` w katalogu `root` do
+    formatu binarnego i zapisuje plany usuwania źródeł i ujść.
+
+    :param remove: bool
+        Jeżeli True, pliki dig6 są usuwane po udanej konwersji.
+    :return: list
+        Lista ścieżek utworzonych plików.
+    '''
+    created = []
+    for cycles in sorted(os.listdir(root)):
+        directory = root + "/" + cycles
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.dig6'):
+                continue
+            n = int(name[:-len('.dig6')])
+            path = directory + "/%d.bin" % n
+            with open(directory + "/" + name, 'r') as file:
+                write_store(path, n, _dig6_records(file, n))
+            with TournamentStore(path) as store:
+                write_plans(directory + "/%d.plan" % n, n, store.records())
+            if remove:
+                os.remove(directory + "/" + name)
+            created.append(path)
+    return created